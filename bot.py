@@ -7,7 +7,7 @@
 #   - Auto Filter (MongoDB)
 #   - Multi-Channel Indexing (ID Batch Fetching)
 #   - Safe Bulk Delete (Preview & Confirm)
-#   - Web Verification (Flask + Ads)
+#   - Web Verification (aiohttp + Ads)
 #   - Content Protection (Forward Block)
 #   - Auto Admin Notification
 #   - Auto Broadcast & Group Messenger
@@ -23,21 +23,33 @@ import os
 import re
 import time
 import math
+import heapq
 import asyncio
+from queue import Queue
 import logging
+from logging.handlers import QueueHandler, QueueListener
 import secrets
 import urllib.parse
-from datetime import datetime, timezone, timedelta
-from threading import Thread
+from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
 
 # ------------------- EXTERNAL LIBRARIES -------------------
 import ujson  # For Fast JSON parsing
 import aiohttp # For Async Web Requests (TMDB/API)
-from flask import Flask # For Web Verification Server
+from cachetools import TTLCache, LRUCache, LFUCache # For In-Memory Caches
+from aiohttp import web # For Web Verification Server (Runs on the bot loop)
+
+# libuv event loop when available (must be set before the Pyrogram client grabs a loop)
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    pass
 
 # ------------------- PYROGRAM -------------------
-from pyrogram import Client, filters
+from pyrogram import Client, filters, idle
+from pyrogram.enums import ChatType
 from pyrogram.types import (
     Message, 
     InlineKeyboardMarkup, 
@@ -55,9 +67,10 @@ from pyrogram.errors import (
 )
 
 # ------------------- DATABASE & LOGIC -------------------
-from motor.motor_asyncio import AsyncIOMotorClient # Async MongoDB
-from pymongo import MongoClient, ASCENDING # Sync MongoDB (For Indexing)
-from fuzzywuzzy import process, fuzz # Fuzzy Logic for Spelling
+from pymongo import AsyncMongoClient # Native Async MongoDB (PyMongo 4.10+)
+from pymongo import ASCENDING, UpdateOne, WriteConcern
+from pymongo.errors import OperationFailure, BulkWriteError, DuplicateKeyError
+from rapidfuzz import process, fuzz # Fuzzy Logic for Spelling (C++ core)
 from marshmallow import Schema, fields, ValidationError # Schema Validation
 
 # ==============================================================================
@@ -82,7 +95,12 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 
 # Search Settings
 RESULTS_COUNT = int(os.getenv("RESULTS_COUNT", 10))
+FUZZY_MIN_LEN = 4 # Shorter queries skip the fuzzy spelling fallback
+# Threads behind asyncio.to_thread (fuzzy matching, /index parsing)
+THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", (os.cpu_count() or 1) * 2))
 TMDB_API_KEY = os.getenv("TMDB_API_KEY") 
+# Atlas Search index name for fuzzy spelling correction (leave empty if not on Atlas)
+ATLAS_SEARCH_INDEX = os.getenv("ATLAS_SEARCH_INDEX", "")
 
 # Images
 START_PIC = os.getenv("START_PIC", "https://i.ibb.co/prnGXMr3/photo-2025-05-16-05-15-45-7504908428624527364.jpg")
@@ -90,6 +108,7 @@ BROADCAST_PIC = os.getenv("BROADCAST_PIC", "https://telegra.ph/file/18659550b694
 
 # Web & Ads Settings
 BASE_URL = os.getenv("BASE_URL", "http://localhost:8080") 
+WEB_PORT = int(os.getenv("PORT", "8080"))
 
 # Ad Codes (Full HTML allowed)
 AD_CODE_HEAD = os.getenv("AD_CODE_HEAD", "") 
@@ -123,6 +142,12 @@ logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
+# Handlers only enqueue; a listener thread does the stderr writes, so an error storm
+# never blocks the event loop on the stream lock
+_root_logger = logging.getLogger()
+log_listener = QueueListener(Queue(-1), *_root_logger.handlers, respect_handler_level=True)
+_root_logger.handlers = [QueueHandler(log_listener.queue)]
+log_listener.start()
 logger = logging.getLogger(__name__)
 
 # ==============================================================================
@@ -130,9 +155,22 @@ logger = logging.getLogger(__name__)
 # ==============================================================================
 
 try:
-    # Async Client for Bot Operations
-    motor_client = AsyncIOMotorClient(DATABASE_URL)
-    db = motor_client["movie_bot"]
+    # Async Client for Bot Operations (no Motor thread hop)
+    # Pool matches the 64 update workers + wire compression (zstd needs `zstandard`, else zlib is used)
+    # w=1 without journal: writes are acked by the primary alone (replica sets default to majority)
+    async_client = AsyncMongoClient(
+        DATABASE_URL,
+        maxPoolSize=64, # = Pyrogram workers = search_semaphore, so no handler waits for a socket
+        minPoolSize=5,
+        maxIdleTimeMS=60000, # Burst connections above the warm 5 are closed after a minute idle
+        waitQueueTimeoutMS=10000,
+        serverSelectionTimeoutMS=5000,
+        compressors="zstd,zlib",
+        w=1,
+        journal=False,
+        retryWrites=True
+    )
+    db = async_client["movie_bot"]
 
     movies_col = db["movies"]
     users_col = db["users"]
@@ -142,31 +180,54 @@ try:
     feedback_col = db["feedback"]
     verify_col = db["verification"] 
 
-    # Sync Client for Indexing & TTL
-    sync_client = MongoClient(DATABASE_URL)
-    sync_db = sync_client["movie_bot"]
-    
-    # Creating Indexes for Faster Search
-    # Note: Removed unique=True from message_id to allow same message_id from different channels
-    sync_db.movies.create_index([("title_clean", ASCENDING)], background=True)
-    sync_db.movies.create_index("language", background=True)
-    sync_db.movies.create_index([("views_count", ASCENDING)], background=True)
-    sync_db.movies.create_index([("chat_id", ASCENDING)], background=True) # New for multi-channel
-    
-    # TTL Index (Verification Token expires after 1 hour)
-    sync_db.verification.create_index("created_at", expireAfterSeconds=3600)
-    
-    print("✅ Database Connected & Indexes Created Successfully!")
-except Exception as e:
-    print(f"⚠️ Database Connection Error: {e}")
+    print("✅ Database Client Ready!")
+except Exception:
+    logger.exception("Database Connection Error")
+    log_listener.stop() # Flush the record before exiting
     exit()
 
+# Indexes for Faster Search: (collection, keys, options)
+# Note: message_id alone is not unique (same message_id can exist in different channels),
+# but the (chat_id, message_id) pair is, so duplicate saves are rejected by the server.
+INDEX_SPECS = [
+    ("movies", [("chat_id", ASCENDING), ("message_id", ASCENDING)], {"unique": True}),
+    ("movies", [("message_id", ASCENDING)], {}), # /start watch_ & verify lookups
+    ("movies", [("title_clean", ASCENDING)], {}),
+    ("movies", [("language", ASCENDING)], {}),
+    ("movies", [("views_count", ASCENDING)], {}),
+    ("movies", [("chat_id", ASCENDING)], {}), # New for multi-channel
+    ("movies", [("title_tokens", ASCENDING)], {}), # Multikey (word list)
+    # Full-Text Index (Primary Search Path)
+    ("movies", [("title", "text"), ("title_clean", "text")], {"default_language": "none", "weights": {"title": 5, "title_clean": 1}}),
+    # TTL Index (Verification Token expires after 1 hour)
+    ("verification", [("created_at", ASCENDING)], {"expireAfterSeconds": 3600}),
+    ("verification", [("token", ASCENDING)], {"unique": True}), # Every verify page & verified_ claim
+    # Notification fanout: equality on notify, then _id (covered by the index)
+    ("users", [("notify", ASCENDING), ("_id", ASCENDING)], {}),
+]
+
+async def ensure_indexes():
+    """ Creates missing indexes only. Runs as a loop task so startup isn't blocked. """
+    existing = {}
+    for coll_name, keys, options in INDEX_SPECS:
+        name = "_".join(f"{field}_{kind}" for field, kind in keys)
+        try:
+            if coll_name not in existing:
+                existing[coll_name] = {i["name"] async for i in await db[coll_name].list_indexes()}
+            if name in existing[coll_name]:
+                continue
+            await db[coll_name].create_index(keys, name=name, background=True, **options)
+            logger.info("Index Created: %s.%s", coll_name, name)
+        except Exception as e:
+            logger.error("Index Error (%s.%s): %s", coll_name, name, e)
+
 # Data Validation Schema
 class MovieSchema(Schema):
     chat_id = fields.Int(required=True) # Source Channel ID
     message_id = fields.Int(required=True) # Message ID
     title = fields.Str(required=True)
     title_clean = fields.Str(required=True)
+    title_tokens = fields.List(fields.Str(), load_default=list)
     full_caption = fields.Str(allow_none=True)
     year = fields.Int(allow_none=True)
     language = fields.Str(allow_none=True)
@@ -182,14 +243,33 @@ async def init_settings():
         await settings_col.update_one({"key": "protect_content"}, {"$setOnInsert": {"value": True}}, upsert=True)
         await settings_col.update_one({"key": "verification_mode"}, {"$setOnInsert": {"value": True}}, upsert=True)
         await settings_col.update_one({"key": "global_notify"}, {"$setOnInsert": {"value": True}}, upsert=True)
+        # Older user docs have no 'notify' field; fill it so {"notify": True} can use the index
+        await users_col.update_many({"notify": {"$exists": False}}, {"$set": {"notify": True}})
     except Exception as e:
-        logger.error(f"Settings Init Error: {e}")
+        logger.error("Settings Init Error: %s", e)
+
+# Settings Cache: key -> (value, expires_at). Admin toggles refresh it immediately.
+SETTINGS_TTL = 30
+settings_cache = {}
+
+async def get_setting(key, default=True):
+    entry = settings_cache.get(key)
+    if entry and entry[1] > time.monotonic():
+        return entry[0]
+    doc = await settings_col.find_one({"key": key}, {"value": 1, "_id": 0})
+    val = doc.get("value", default) if doc else default
+    settings_cache[key] = (val, time.monotonic() + SETTINGS_TTL)
+    return val
+
+async def set_setting(key, value):
+    await settings_col.update_one({"key": key}, {"$set": {"value": value}}, upsert=True)
+    settings_cache[key] = (value, time.monotonic() + SETTINGS_TTL)
 
 # ==============================================================================
-#                           FLASK WEB SERVER (VERIFICATION)
+#                           WEB SERVER (VERIFICATION)
 # ==============================================================================
 
-flask_app = Flask(__name__)
+web_app = web.Application()
 
 # Full HTML Template
 def get_verification_html(heading, timer_seconds, next_link, btn_text):
@@ -346,59 +426,148 @@ def get_verification_html(heading, timer_seconds, next_link, btn_text):
     </html>
     """
 
-@flask_app.route("/")
-def home():
-    return "Bot & Web Server is Running Successfully! 🚀"
+# Pre-rendered Pages (Ad codes baked in once; only the button link changes per request)
+def split_verification_html(heading, btn_text, timer_seconds=10):
+    marker = "__NEXT_LINK__"
+    head, tail = get_verification_html(heading, timer_seconds, marker, btn_text).split(marker)
+    return head, tail
 
-@flask_app.route("/verify/<token>")
-def verify_page_one(token):
+PAGE_ONE_HTML = split_verification_html("Step 1/2: Verifying your request...", "Next Step 🚀")
+PAGE_TWO_HTML = split_verification_html("Step 2/2: Generating Download Link...", "GET FILE NOW ✅")
+
+def html_response(text):
+    return web.Response(text=text, content_type="text/html")
+
+async def home(request):
+    return html_response("Bot & Web Server is Running Successfully! 🚀")
+
+async def verify_page_one(request):
+    token = request.match_info["token"]
+    await wait_for_token(token)
     # Validate Token
-    data = sync_db.verification.find_one({"token": token})
+    data = await verify_col.find_one({"token": token}, {"_id": 1})
     if not data:
-        return "❌ <b>Invalid or Expired Link!</b><br>Please go back to Telegram and search again."
+        return html_response("❌ <b>Invalid or Expired Link!</b><br>Please go back to Telegram and search again.")
 
     # Page 1
     next_url = f"{BASE_URL}/verify/step2/{token}"
-    return get_verification_html(
-        heading="Step 1/2: Verifying your request...",
-        timer_seconds=10,
-        next_link=next_url,
-        btn_text="Next Step 🚀"
-    )
+    return html_response(PAGE_ONE_HTML[0] + next_url + PAGE_ONE_HTML[1])
 
-@flask_app.route("/verify/step2/<token>")
-def verify_page_two(token):
+async def verify_page_two(request):
+    token = request.match_info["token"]
+    await wait_for_token(token)
     # Update Step
-    res = sync_db.verification.update_one({"token": token}, {"$set": {"step": 2}})
+    res = await verify_col.update_one({"token": token}, {"$set": {"step": 2}})
     if res.matched_count == 0:
-        return "❌ <b>Session Expired!</b><br>Please search again."
+        return html_response("❌ <b>Session Expired!</b><br>Please search again.")
 
     # Page 2
-    bot_username = app.me.username if app.me else "TGLinkBaseBot" 
-    final_link = f"https://t.me/{bot_username}?start=verified_{token}"
-
-    return get_verification_html(
-        heading="Step 2/2: Generating Download Link...",
-        timer_seconds=10,
-        next_link=final_link,
-        btn_text="GET FILE NOW ✅"
-    )
+    final_link = (VERIFIED_LINK or "https://t.me/TGLinkBaseBot?start=verified_") + token
+
+    return html_response(PAGE_TWO_HTML[0] + final_link + PAGE_TWO_HTML[1])
 
-def run_flask():
-    flask_app.run(host="0.0.0.0", port=8080)
+web_app.router.add_get("/", home)
+web_app.router.add_get("/verify/{token}", verify_page_one)
+web_app.router.add_get("/verify/step2/{token}", verify_page_two)
+
+async def run_web_server():
+    # Per-request access logging is off: every verify click would write a log line
+    runner = web.AppRunner(web_app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "0.0.0.0", WEB_PORT, backlog=1024).start()
+    print(f"✅ Web Server Started on Port {WEB_PORT}...")
 
 # ==============================================================================
 #                           BOT UTILITIES & HELPERS
 # ==============================================================================
 
-# Thread Pool for Fuzzy Search
-thread_pool_executor = ThreadPoolExecutor(max_workers=5)
+# Search Result Cache: (normalized query, offset) -> results tuple
+# Cleared whenever movies are added or deleted.
+_SEARCH_CACHE = TTLCache(maxsize=2048, ttl=60)
+# Match count per search filter, so page turns skip the count stage
+_TOTAL_CACHE = TTLCache(maxsize=10_000, ttl=300)
+
+def clear_search_cache():
+    _SEARCH_CACHE.clear()
+    _TOTAL_CACHE.clear()
+
+# Short-lived button payloads: callback_data carries a token, the value stays here
+PENDING = TTLCache(maxsize=10_000, ttl=900)
+
+def stash_payload(value):
+    token = secrets.token_urlsafe(6)
+    PENDING[token] = value
+    return token
 
 # Pyrogram Client Initialization
-app = Client("movie_bot", api_id=API_ID, api_hash=API_HASH, bot_token=BOT_TOKEN)
+# More update workers so bursts of /start downloads don't queue behind each other
+app = Client("movie_bot", api_id=API_ID, api_hash=API_HASH, bot_token=BOT_TOKEN, workers=64)
+
+# Bot Identity (Cached once the client has started)
+BOT_USERNAME = None
+BOT_FIRST_NAME = None
+WATCH_LINK = None # "https://t.me/<bot>?start=watch_", message id is appended
+VERIFIED_LINK = None # "https://t.me/<bot>?start=verified_", token is appended
+ADD_GROUP_LINK = None
+
+# Telegram Send Budget (~30 messages/second per bot), shared by every bulk/admin send
+SEND_RATE = 30
+_next_send_at = 0.0
+_pause_until = 0.0 # Set by any FloodWait: every sender backs off, not just the one that hit it
+
+async def send_slot():
+    """ Waits for the next free send slot so concurrent senders stay under SEND_RATE. """
+    global _next_send_at
+    while True:
+        now = time.monotonic()
+        pause = _pause_until - now
+        if pause > 0:
+            await asyncio.sleep(pause)
+            continue
+        wait = _next_send_at - now
+        _next_send_at = max(now, _next_send_at) + 1 / SEND_RATE
+        if wait > 0:
+            await asyncio.sleep(wait)
+        # Another sender may have hit a FloodWait while we slept on this slot
+        if _pause_until <= time.monotonic():
+            return
+
+async def send_limited(func, *args, **kwargs):
+    """ Calls a Telegram send method inside the global budget; retries once after a FloodWait. """
+    global _pause_until, _next_send_at
+    await send_slot()
+    try:
+        return await func(*args, **kwargs)
+    except FloodWait as e:
+        _pause_until = max(_pause_until, time.monotonic() + e.value)
+        # Slots handed out after the pause start from its end, not inside the penalty window
+        _next_send_at = max(_next_send_at, _pause_until)
+        await send_slot()
+        return await func(*args, **kwargs)
+
+async def notify_admins(text, reply_markup=None):
+    """ Sends to all admins concurrently. Returns one result (or exception) per admin. """
+    return await asyncio.gather(
+        *(send_limited(app.send_message, admin_id, text, reply_markup=reply_markup) for admin_id in ADMIN_IDS),
+        return_exceptions=True
+    )
+
+# Upper bound for a file copy so a stuck upstream call can't hang /start
+COPY_TIMEOUT = 15
+
+async def send_movie_file(chat_id, from_chat_id, message_id, protect_content):
+    return await asyncio.wait_for(
+        app.copy_message(
+            chat_id=chat_id,
+            from_chat_id=from_chat_id,
+            message_id=message_id,
+            protect_content=protect_content
+        ),
+        timeout=COPY_TIMEOUT
+    )
 
 # Stop Words for Cleaning Titles
-STOP_WORDS = [
+STOP_WORDS = frozenset({
     "movie", "movies", "film", "films", "cinema", "show", "series", "season", "episode", 
     "full", "link", "links", "download", "watch", "online", "free", "all", "part", "url",
     "hindi", "bengali", "bangla", "english", "tamil", "telugu", "kannada", "malayalam", 
@@ -407,71 +576,166 @@ STOP_WORDS = [
     "hd", "fhd", "4k", "8k", "1080p", "720p", "480p", "360p", "240p", 
     "cam", "hdcam", "rip", "web", "webrip", "hdrip", "bluray", "dvd", "dvdscr", 
     "hevc", "x264", "x265", "10bit", "60fps", "hdr", "amzn", "nf", "hulu", "mp4", "mkv"
-]
+})
+
+# Precompiled Cleaning Patterns
+_YEAR_RE = re.compile(r'(?<!\d)(19|20)\d{2}(?!\d)')
+_NONALNUM_RE = re.compile(r'[^a-z0-9\s]')
+# Single-pass query cleaner: brackets, parentheses, quality tags, years,
+# season/episode markers and punctuation are all removed in one scan.
+_QUERY_CLEAN_RE = re.compile(
+    r'\[.*?\]'
+    r'|\(.*?\)'
+    r'|\b(?:480p|720p|1080p|2160p|4k|8k|hd|fhd|bluray|web-dl|webrip|camrip|dvdscr)\b'
+    r'|\b(?:19|20)\d{2}\b'
+    r'|\bs\d{1,2}(?:e\d{1,2})?\b'
+    r'|\bseason\s?\d{1,2}\b'
+    r'|\bepisode\s?\d{1,3}\b'
+    r'|[^a-z0-9\s]'
+)
+
+def clean_tokens(text):
+    """Splits text into lowercase words without years and stop words."""
+    text = text.lower()
+    text = _YEAR_RE.sub('', text) 
+    text = _NONALNUM_RE.sub(' ', text)
+    return [w for w in text.split() if w not in STOP_WORDS]
 
 def clean_text(text):
     """Cleans text for database indexing."""
-    text = text.lower()
-    text = re.sub(r'(?<!\d)(19|20)\d{2}(?!\d)', '', text) 
-    text = re.sub(r'[^a-z0-9\s]', ' ', text)
-    words = text.split()
-    filtered_words = [w for w in words if w not in STOP_WORDS]
-    return "".join(filtered_words)
+    return "".join(clean_tokens(text))
 
 def smart_search_clean(text):
     """Cleans user query for searching."""
-    text = text.lower()
-    text = re.sub(r'\[.*?\]', '', text)
-    text = re.sub(r'\(.*?\)', '', text)
-    text = re.sub(r'\b(480p|720p|1080p|2160p|4k|8k|hd|fhd|bluray|web-dl|webrip|camrip|dvdscr)\b', '', text)
-    text = re.sub(r'\b(19|20)\d{2}\b', '', text)
-    text = re.sub(r'\bs\d{1,2}(e\d{1,2})?\b', '', text)
-    text = re.sub(r'\bseason\s?\d{1,2}\b', '', text)
-    text = re.sub(r'\bepisode\s?\d{1,3}\b', '', text)
-    text = re.sub(r'[^a-z0-9\s]', ' ', text)
-    words = text.split()
+    words = _QUERY_CLEAN_RE.sub(' ', text.lower()).split()
     clean_words = [w for w in words if w not in STOP_WORDS and len(w) > 1]
     return " ".join(clean_words).strip()
 
+LANGUAGES = ("Bengali", "Hindi", "English", "Tamil", "Telugu", "Korean")
+_META_RE = re.compile(
+    r'(?P<year>\b(?:19|20)\d{2}\b)|(?P<lang>' + "|".join(LANGUAGES) + ')',
+    re.IGNORECASE
+)
+_LANGS_LOWER = tuple((lang.lower(), lang) for lang in LANGUAGES) # (match key, stored name)
+
+def parse_meta(text):
+    """ Single pass over a caption: returns (first year, language by LANGUAGES priority). """
+    year = None
+    found = set()
+    for match in _META_RE.finditer(text):
+        if match.lastgroup == "year":
+            if year is None:
+                year = int(match.group())
+        else:
+            found.add(match.group().lower())
+    language = next((lang for key, lang in _LANGS_LOWER if key in found), None)
+    return year, language
+
 def extract_language(text):
-    langs = ["Bengali", "Hindi", "English", "Tamil", "Telugu", "Korean"]
-    return next((lang for lang in langs if lang.lower() in text.lower()), None)
+    return parse_meta(text)[1]
 
 def extract_year(text):
-    match = re.search(r'\b(19|20)\d{2}\b', text)
-    return int(match.group(0)) if match else None
+    return parse_meta(text)[0]
 
 def get_readable_time(seconds):
     m, s = divmod(seconds, 60)
     h, m = divmod(m, 60)
     return f"{int(h):02d}:{int(m):02d}:{int(s):02d}"
 
+_greet_cache = [0.0, ""] # [computed_at, greeting]
+
 def get_greeting():
+    now = time.monotonic()
+    if _greet_cache[1] and now - _greet_cache[0] < 60:
+        return _greet_cache[1]
+
     utc_now = datetime.now(timezone.utc)
     bd_hour = (utc_now.hour + 6) % 24
-    if 5 <= bd_hour < 12: return "GOOD MORNING ☀️"
-    elif 12 <= bd_hour < 17: return "GOOD AFTERNOON 🌤️"
-    elif 17 <= bd_hour < 21: return "GOOD EVENING 🌇"
-    else: return "GOOD NIGHT 🌙"
+    if 5 <= bd_hour < 12: greet = "GOOD MORNING ☀️"
+    elif 12 <= bd_hour < 17: greet = "GOOD AFTERNOON 🌤️"
+    elif 17 <= bd_hour < 21: greet = "GOOD EVENING 🌇"
+    else: greet = "GOOD NIGHT 🌙"
+    _greet_cache[:] = [now, greet]
+    return greet
+
+# Scheduled Deletes: one heap of (expire_ts, chat_id, message_id) served by delete_worker
+pending_deletes = []
+deletes_event = asyncio.Event()
+
+def delete_message_later(chat_id, message_id, delay=300): 
+    heapq.heappush(pending_deletes, (time.time() + delay, chat_id, message_id))
+    deletes_event.set()
+
+# At most this many chats are being cleaned at once
+delete_semaphore = asyncio.Semaphore(10)
+
+async def delete_chat_messages(chat_id, message_ids):
+    async with delete_semaphore:
+        # Telegram takes at most 100 ids per delete call
+        for i in range(0, len(message_ids), 100):
+            try:
+                # Shared send budget + FloodWait pause, like the other bulk senders
+                await send_limited(app.delete_messages, chat_id, message_ids[i:i + 100])
+            except Exception:
+                pass
 
-async def delete_message_later(chat_id, message_id, delay=300): 
-    await asyncio.sleep(delay)
-    try:
-        await app.delete_messages(chat_id, message_id)
-    except Exception:
-        pass
+async def delete_worker():
+    """ Single background task that deletes scheduled messages once they are due """
+    while True:
+        deletes_event.clear()
+        if not pending_deletes:
+            await deletes_event.wait()
+            continue
+
+        wait = pending_deletes[0][0] - time.time()
+        if wait > 0:
+            # Wake early if a message with a shorter delay gets scheduled
+            try:
+                await asyncio.wait_for(deletes_event.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        # Group everything due by chat -> one delete_messages call per chat
+        due = defaultdict(list)
+        now = time.time()
+        while pending_deletes and pending_deletes[0][0] <= now:
+            _, chat_id, message_id = heapq.heappop(pending_deletes)
+            due[chat_id].append(message_id)
+
+        # Chats are independent; the semaphore and send budget keep the burst bounded
+        await asyncio.gather(*(delete_chat_messages(chat_id, ids) for chat_id, ids in due.items()))
+
+# Pending Verification Tokens (Flushed to DB in batches by verify_flusher)
+verify_queue = asyncio.Queue()
+verify_pending = {}
+
+# Source channel per movie for watch_ links; LFU keeps the movies everyone is clicking
+# (a fresh upload notification sends a burst of users to the same message_id)
+_SOURCE_CHAT = LFUCache(maxsize=10_000)
+
+async def get_source_chat(message_id):
+    chat_id = _SOURCE_CHAT.get(message_id)
+    if chat_id is None:
+        movie = await movies_col.find_one({"message_id": message_id}, {"chat_id": 1})
+        # Default to CHANNEL_ID if not found (backward compatibility)
+        # FIX: Use .get() to avoid KeyError on old data
+        chat_id = movie.get("chat_id", CHANNEL_ID) if movie else CHANNEL_ID
+        if movie:
+            _SOURCE_CHAT[message_id] = chat_id
+    return chat_id
 
 # Create Web Verification Link
-async def create_verification_link(message_id, user_id):
+async def create_verification_link(message_id, user_id, chat_id=None):
     token = secrets.token_urlsafe(16)
     
-    # Need to fetch the movie to get correct chat_id
-    movie = await movies_col.find_one({"message_id": message_id})
-    # Default to CHANNEL_ID if not found (backward compatibility)
-    # FIX: Use .get() to avoid KeyError on old data
-    chat_id = movie.get("chat_id", CHANNEL_ID) if movie else CHANNEL_ID
+    # Need to fetch the movie to get correct chat_id (callers holding the doc pass it in)
+    if chat_id is None:
+        chat_id = await get_source_chat(message_id)
 
-    await verify_col.insert_one({
+    # Queued for a batched insert; the user needs seconds before clicking it
+    verify_pending[token] = asyncio.Event()
+    await verify_queue.put({
         "token": token,
         "user_id": user_id,
         "movie_id": message_id,
@@ -481,56 +745,226 @@ async def create_verification_link(message_id, user_id):
     })
     return f"{BASE_URL}/verify/{token}"
 
+async def verify_flusher():
+    """ Writes queued verification tokens with one insert_many per burst """
+    while True:
+        batch = [await verify_queue.get()]
+        await asyncio.sleep(0.05) # Let a burst collect
+        while len(batch) < 500 and not verify_queue.empty():
+            batch.append(verify_queue.get_nowait())
+        try:
+            await verify_col.insert_many(batch, ordered=False)
+        except Exception as e:
+            logger.error("Verify Flush Error: %s", e)
+        for doc in batch:
+            event = verify_pending.pop(doc["token"], None)
+            if event: event.set()
+
+async def wait_for_token(token):
+    """ Waits for a token that is still queued (rare: link clicked within ~50ms) """
+    event = verify_pending.get(token)
+    if event:
+        try:
+            await asyncio.wait_for(event.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            pass
+
+# View Count Buffer: message_id -> pending increments (one bulk write every 10s)
+view_buffer = defaultdict(int)
+
+async def flush_views():
+    global view_buffer
+    if not view_buffer:
+        return
+    batch, view_buffer = view_buffer, defaultdict(int)
+    ops = [UpdateOne({"message_id": mid}, {"$inc": {"views_count": n}}) for mid, n in batch.items()]
+    try:
+        # Unacknowledged: counters aren't worth a round trip
+        await movies_col.with_options(write_concern=WriteConcern(w=0)).bulk_write(ops, ordered=False)
+    except Exception as e:
+        logger.error("View Flush Error: %s", e)
+
+async def view_flusher():
+    while True:
+        await asyncio.sleep(10)
+        await flush_views()
+
+# Shared HTTP Session for TMDB (Keeps connections alive between searches)
+tmdb_session = None
+
+def get_tmdb_session():
+    global tmdb_session
+    if tmdb_session is None or tmdb_session.closed:
+        tmdb_session = aiohttp.ClientSession(
+            json_serialize=ujson.dumps,
+            timeout=aiohttp.ClientTimeout(total=5),
+            connector=aiohttp.TCPConnector(limit=50, ttl_dns_cache=300)
+        )
+    return tmdb_session
+
+# TMDB Answer Cache (query -> title, or _MISS when TMDB had nothing)
+_TMDB_CACHE = TTLCache(maxsize=10_000, ttl=86_400)
+_MISS = object()
+# TMDB allows ~40 requests / 10s, keep bursts small
+tmdb_semaphore = asyncio.Semaphore(4)
+
 # TMDB Fallback Search
 async def get_tmdb_suggestion(query):
     if not TMDB_API_KEY: return None
+    cached = _TMDB_CACHE.get(query)
+    if cached is not None:
+        return None if cached is _MISS else cached
+
     url = f"https://api.themoviedb.org/3/search/multi?api_key={TMDB_API_KEY}&query={urllib.parse.quote(query)}&page=1"
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as resp:
+        async with tmdb_semaphore:
+            async with get_tmdb_session().get(url) as resp:
                 if resp.status == 200:
-                    data = await resp.json()
+                    data = ujson.loads(await resp.read())
+                    title = None
                     if data.get("results"):
                         first_match = data["results"][0]
-                        return first_match.get("title") or first_match.get("name") or first_match.get("original_title")
+                        title = first_match.get("title") or first_match.get("name") or first_match.get("original_title")
+                    _TMDB_CACHE[query] = title or _MISS
+                    return title
     except Exception as e:
-        logger.error(f"TMDB Error: {e}")
+        logger.error("TMDB Error: %s", e)
     return None
 
+def build_text_search(query):
+    """Builds a $text search string where every word is required (quoted phrases are kept as typed)."""
+    if '"' in query:
+        return query
+    return " ".join(f'"{word}"' for word in query.split())
+
 # Fuzzy Matching for Spelling Correction
-def find_corrected_matches(query_clean, all_movie_titles_data, score_cutoff=80, limit=5):
-    if not all_movie_titles_data:
+def find_corrected_matches(query_clean, fuzzy_choices, score_cutoff=80, limit=5):
+    by_clean, choices = fuzzy_choices
+    if not choices:
         return []
-    
-    choices = [item["title_clean"] for item in all_movie_titles_data]
-    matches_raw = process.extract(query_clean, choices, limit=limit, scorer=fuzz.token_set_ratio)
+
+    # score_cutoff is applied inside rapidfuzz, so only good matches come back
+    matches_raw = process.extract(query_clean, choices, scorer=fuzz.token_set_ratio, limit=limit, score_cutoff=score_cutoff)
     
     corrected_suggestions = []
     seen_ids = set()
     
-    for matched_clean_title, score in matches_raw:
-        if score >= score_cutoff:
-            for movie_data in all_movie_titles_data:
-                if movie_data["title_clean"] == matched_clean_title:
-                    if movie_data["message_id"] not in seen_ids:
-                        corrected_suggestions.append({
-                            "title": movie_data["original_title"],
-                            "message_id": movie_data["message_id"],
-                            "language": movie_data.get("language"),
-                            "views_count": movie_data.get("views_count", 0),
-                            "score": score
-                        })
-                        seen_ids.add(movie_data["message_id"])
-                    break
+    for matched_clean_title, score, _ in matches_raw:
+        movie_data = by_clean[matched_clean_title]
+        if movie_data["message_id"] not in seen_ids:
+            corrected_suggestions.append({
+                "title": movie_data["original_title"],
+                "message_id": movie_data["message_id"],
+                "chat_id": movie_data.get("chat_id", CHANNEL_ID),
+                "language": movie_data.get("language"),
+                "views_count": movie_data.get("views_count", 0),
+                "score": score
+            })
+            seen_ids.add(movie_data["message_id"])
                     
     return sorted(corrected_suggestions, key=lambda x: x["score"], reverse=True)
 
+# Fuzzy Fallback Choices: (title_clean -> first movie, [title_clean, ...])
+# Loaded once on the first fuzzy miss, extended on save, dropped on delete.
+_fuzzy_choices = None
+_fuzzy_lock = asyncio.Lock()
+
+def add_fuzzy_choices(docs):
+    if _fuzzy_choices is None:
+        return
+    by_clean, choices = _fuzzy_choices
+    for doc in docs:
+        key = doc.get("title_clean")
+        if key and key not in by_clean:
+            by_clean[key] = {
+                "title_clean": key,
+                "original_title": doc.get("original_title", doc.get("title")),
+                "message_id": doc["message_id"],
+                "chat_id": doc.get("chat_id", CHANNEL_ID),
+                "views_count": doc.get("views_count", 0),
+                "language": doc.get("language")
+            }
+            choices.append(key)
+
+def reset_fuzzy_choices():
+    global _fuzzy_choices
+    _fuzzy_choices = None
+
+async def get_fuzzy_choices():
+    global _fuzzy_choices
+    async with _fuzzy_lock:
+        if _fuzzy_choices is None:
+            docs = await movies_col.find(
+                {}, {"title_clean": 1, "original_title": "$title", "message_id": 1, "chat_id": 1, "views_count": 1, "language": 1}
+            ).batch_size(5000).to_list(length=None)
+            _fuzzy_choices = ({}, [])
+            add_fuzzy_choices(docs)
+    return _fuzzy_choices
+
+# Atlas Search Fuzzy Matching (Runs on the database server's inverted index)
+async def atlas_fuzzy_search(query_clean, limit):
+    pipeline = [
+        {"$search": {
+            "index": ATLAS_SEARCH_INDEX,
+            "text": {
+                "query": query_clean,
+                "path": ["title", "title_clean"],
+                "fuzzy": {"maxEdits": 2, "maxExpansions": 20}
+            },
+            "concurrent": True
+        }},
+        {"$limit": limit},
+        {"$project": {"title": 1, "message_id": 1, "chat_id": 1, "language": 1, "views_count": 1, "score": {"$meta": "searchScore"}}}
+    ]
+    cursor = await movies_col.aggregate(pipeline)
+    return await cursor.to_list(length=limit)
+
+# Page + Total Count in one round-trip (instead of count_documents + find)
+# Only what a result button and its sort need (captions / token lists stay on the server)
+RESULT_FIELDS = {"title": 1, "message_id": 1, "chat_id": 1, "views_count": 1}
+
+async def find_page(match_filter, sort, offset=0, limit=RESULTS_COUNT, text_score=False):
+    # _id tie-breaker: equal view counts keep one fixed order, so pages never repeat or skip a file
+    sort = {**sort, "_id": -1}
+    pipeline = [{"$match": match_filter}]
+    if text_score:
+        pipeline.append({"$project": {**RESULT_FIELDS, "score": {"$meta": "textScore"}}})
+    else:
+        pipeline.append({"$project": RESULT_FIELDS})
+
+    # Total already known for this filter: fetch just the page
+    total_key = repr(match_filter)
+    total = _TOTAL_CACHE.get(total_key)
+    if total == 0:
+        return [], 0 # Known miss: later fallback stages don't re-run it
+    if total is not None:
+        pipeline += [{"$sort": sort}, {"$skip": offset}, {"$limit": limit}]
+        cursor = await movies_col.aggregate(pipeline)
+        return await cursor.to_list(length=limit), total
+
+    pipeline.append({"$facet": {
+        "data": [{"$sort": sort}, {"$skip": offset}, {"$limit": limit}],
+        "total": [{"$count": "n"}]
+    }})
+    cursor = await movies_col.aggregate(pipeline)
+    res = await cursor.to_list(length=1)
+    total = res[0]["total"][0]["n"] if res and res[0]["total"] else 0
+    _TOTAL_CACHE[total_key] = total
+    return (res[0]["data"] if total else []), total
+
 # Helper function to consolidate search logic and allow Pagination
-async def get_search_results(query, offset=0):
+async def get_search_results(query, offset=0, corrections=True):
     """
     Executes the search logic (Regex > TMDB > Fuzzy).
+    corrections=False skips the TMDB / fuzzy fallbacks (filter buttons must match as typed).
     Returns (results_list, total_count, search_source, cleaned_query, tmdb_detected_title)
     """
+    # Keyed on the full query (not the cleaned one) so "Avengers 720p" filters stay distinct
+    cache_key = (" ".join(query.lower().split()), offset)
+    cached = _SEARCH_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
     raw_year = extract_year(query)
     cleaned_query = smart_search_clean(query)
     # If cleaned query is empty (e.g. only '720p' was typed), use original lower query
@@ -552,74 +986,107 @@ async def get_search_results(query, offset=0):
     results = []
     total_count = 0
 
-    # 1. Direct Regex Search (Matches Title OR Clean Title)
-    # This supports "Avengers 720p" matching against "Avengers: Endgame (2019) [720p]"
-    query_filter = {
-        "$or": [
-            {"title_clean": {"$regex": search_query_regex, "$options": "i"}},
-            {"title": {"$regex": search_query_regex, "$options": "i"}}
-        ]
-    }
-    if raw_year: query_filter["year"] = raw_year
-    
-    # Get total count first for pagination
-    total_count = await movies_col.count_documents(query_filter)
+    # 1. Full-Text Search (Uses the text index instead of a collection scan)
+    # Every word must match, so "Avengers 720p" still narrows down to 720p files.
+    text_filter = {"$text": {"$search": build_text_search(query)}}
+    if raw_year: text_filter["year"] = raw_year
     
-    if total_count > 0:
-        cursor = movies_col.find(query_filter).sort("views_count", -1).skip(offset).limit(RESULTS_COUNT)
-        results = await cursor.to_list(length=RESULTS_COUNT)
+    try:
+        results, total_count = await find_page(text_filter, {"score": -1, "views_count": -1}, offset, text_score=True)
+    except OperationFailure as e:
+        # Text index missing (still building after deploy / build failed): use the stages below
+        logger.error("Text Search Error: %s", e)
+
+    # 1b. Direct Regex Search (Fallback for short / partial queries like "aveng")
+    # This supports "Avengers 720p" matching against "Avengers: Endgame (2019) [720p]"
+    if not results and len(query.split()) < 3:
+        # title_clean is stored via clean_text (lowercase, no spaces), so match it in
+        # that same form without $options: "i"
+        query_filter = {
+            "$or": [
+                {"title_clean": {"$regex": re.escape(clean_text(query) or query.lower())}},
+                {"title": {"$regex": search_query_regex, "$options": "i"}}
+            ]
+        }
+        if raw_year: query_filter["year"] = raw_year
+        
+        results, total_count = await find_page(query_filter, {"views_count": -1}, offset)
     
-    # 2. Loose Search (only if no direct results found & no specific year filter)
+    # 2. Token Search (every cleaned word must be a title word, served by the multikey index)
+    if not results and not raw_year:
+        token_filter = {"title_tokens": {"$all": cleaned_query.split()}}
+        results, total_count = await find_page(token_filter, {"views_count": -1}, offset)
+
+    # 2b. Loose Search (only if no direct results found & no specific year filter)
+    # Older entries have no title_tokens, so keep a prefix match on title_clean as well.
+    # title_clean is already lowercase without spaces, so a plain $gte/$lt range
+    # is a tight bounded scan on the title_clean index (no regex at all).
     if not results and not raw_year:
         # Fallback to cleaned query
-        loose_pattern = re.escape(cleaned_query)
-        loose_filter = {"title_clean": {"$regex": loose_pattern, "$options": "i"}}
-        
-        total_count = await movies_col.count_documents(loose_filter)
+        prefix = cleaned_query.replace(" ", "")
+        loose_filter = {"title_clean": {"$gte": prefix, "$lt": prefix + "\uffff"}}
         
-        if total_count > 0:
-            cursor = movies_col.find(loose_filter).sort("views_count", -1).skip(offset).limit(RESULTS_COUNT)
-            results = await cursor.to_list(length=RESULTS_COUNT)
+        results, total_count = await find_page(loose_filter, {"views_count": -1}, offset)
 
     # 3. TMDB Search (only on first page)
     tmdb_detected_title = None
-    if not results and offset == 0: 
+    if not results and offset == 0 and corrections:
         tmdb_detected_title = await get_tmdb_suggestion(cleaned_query)
         if tmdb_detected_title:
-            tmdb_clean = clean_text(tmdb_detected_title)
-            tmdb_filter = {
-                "$or": [
-                    {"title_clean": {"$regex": re.escape(tmdb_clean), "$options": "i"}},
-                    {"title": {"$regex": re.escape(tmdb_detected_title), "$options": "i"}}
-                ]
-            }
-            total_count = await movies_col.count_documents(tmdb_filter)
-            if total_count > 0:
-                cursor = movies_col.find(tmdb_filter).sort("views_count", -1).limit(RESULTS_COUNT)
-                results = await cursor.to_list(length=RESULTS_COUNT)
+            # Text index instead of an unanchored regex scan; stop words are dropped
+            # unless the title is made of nothing else (e.g. "Movie")
+            tmdb_words = clean_tokens(tmdb_detected_title) or _NONALNUM_RE.sub(' ', tmdb_detected_title.lower()).split()
+            if tmdb_words:
+                tmdb_filter = {"$text": {"$search": build_text_search(" ".join(tmdb_words))}}
+                try:
+                    results, total_count = await find_page(tmdb_filter, {"score": -1, "views_count": -1}, text_score=True)
+                except OperationFailure as e:
+                    logger.error("Text Search Error: %s", e)
+            if results:
                 search_source = f"✅ **Auto Corrected:** '{tmdb_detected_title}'"
 
     # 4. Fuzzy Search (Last Resort)
-    if not results and not raw_year and not tmdb_detected_title and offset == 0:
-        all_movie_data = await movies_col.find({}, {"title_clean": 1, "original_title": "$title", "message_id": 1, "views_count": 1, "language": 1}).to_list(length=None)
-        
-        corrected_suggestions = await asyncio.get_event_loop().run_in_executor(
-            thread_pool_executor, find_corrected_matches, cleaned_query, all_movie_data, 80, RESULTS_COUNT
-        )
+    # Very short queries only produce noise at an 80 cutoff, so they skip it
+    if (not results and not raw_year and not tmdb_detected_title and offset == 0 and corrections
+            and len(cleaned_query.replace(" ", "")) >= FUZZY_MIN_LEN):
+        corrected_suggestions = []
+        atlas_ok = False
+        if ATLAS_SEARCH_INDEX:
+            try:
+                corrected_suggestions = await atlas_fuzzy_search(cleaned_query, RESULTS_COUNT)
+                atlas_ok = True
+            except OperationFailure as e:
+                logger.error("Atlas Search Error: %s", e)
+
+        # In-process fallback when Atlas Search is not configured / unavailable
+        if not atlas_ok:
+            fuzzy_choices = await get_fuzzy_choices()
+            if len(fuzzy_choices[1]) < 100:
+                # A handful of titles is cheaper to score inline than a thread hop
+                corrected_suggestions = find_corrected_matches(cleaned_query, fuzzy_choices, 80, RESULTS_COUNT)
+            else:
+                corrected_suggestions = await asyncio.to_thread(
+                    find_corrected_matches, cleaned_query, fuzzy_choices, 80, RESULTS_COUNT
+                )
         if corrected_suggestions:
             results = corrected_suggestions
             total_count = len(results)
             search_source = f"🤔 আপনি কি **{corrected_suggestions[0]['title']}** খুঁজছেন?"
 
-    return results, total_count, search_source, cleaned_query, tmdb_detected_title
+    output = (results, total_count, search_source, cleaned_query, tmdb_detected_title)
+    # Don't cache TMDB / fuzzy corrections, so a wrong guess isn't sticky
+    # (nor a miss that skipped them, or a normal search would reuse it)
+    if not search_source and not tmdb_detected_title and (results or corrections):
+        _SEARCH_CACHE[cache_key] = output
+    return output
 
 # ==============================================================================
 #                           CORE LOGIC: SAVING & BROADCAST
 # ==============================================================================
 
-async def process_movie_save(message):
+def build_movie_doc(message):
     """
-    Parses a message and saves it to the database.
+    Parses a message into a validated movie document (None if it isn't a movie post).
     Ensures 'Same to Same' copy by saving the ID and extracting the Title from the first line.
     Works for both Direct Files and Link Posts (Photos with Captions).
     """
@@ -630,7 +1097,9 @@ async def process_movie_save(message):
     if not (message.photo or message.video or message.document or message.audio):
         return None
 
-    movie_title = text.splitlines()[0].strip()
+    # First line only, without building a list of every line
+    nl = text.find('\n')
+    movie_title = (text if nl == -1 else text[:nl]).strip()
     
     if len(movie_title) < 2: 
         return None
@@ -643,29 +1112,69 @@ async def process_movie_save(message):
     elif message.document and message.document.thumbs:
         thumbnail_file_id = message.document.thumbs[0].file_id
 
+    year, language = parse_meta(text)
+
     raw_data = {
         "chat_id": message.chat.id,    # Source Channel ID
         "message_id": message.id,      # Source Message ID
         "title": movie_title,          # Display Title
         "full_caption": text,          # Full Caption
         "date": message.date,
-        "year": extract_year(text),    
-        "language": extract_language(text), 
+        "year": year,
+        "language": language,
         "title_clean": clean_text(text), 
+        "title_tokens": list(dict.fromkeys(clean_tokens(movie_title))),
         "views_count": 0,
         "thumbnail_id": thumbnail_file_id 
     }
 
     try:
-        existing = await movies_col.find_one({"chat_id": message.chat.id, "message_id": message.id})
-        if not existing:
-            validated_data = movie_schema.load(raw_data)
-            await movies_col.insert_one(validated_data)
-            return movie_title
+        return movie_schema.load(raw_data)
     except ValidationError as err:
-        logger.error(f"Validation Error: {err.messages}")
+        logger.error("Validation Error: %s", err.messages)
+    return None
+
+def prepare_movie_docs(messages, existing_ids):
+    """ Builds documents for a fetched batch (run in a thread). Returns (new_docs, skipped, exists). """
+    new_docs, skipped, exists = [], 0, 0
+    for message in messages:
+        if not message or message.empty:
+            continue
+        if message.id in existing_ids:
+            exists += 1
+            continue
+        try:
+            movie_doc = build_movie_doc(message)
+            if movie_doc:
+                new_docs.append(movie_doc)
+            else:
+                skipped += 1
+        except Exception as e:
+            logger.error("Save Error: %s", e)
+    return new_docs, skipped, exists
+
+async def process_movie_save(message):
+    """ Saves a single channel post to the database. Returns (title, thumbnail_id) if it was newly added. """
+    movie_doc = build_movie_doc(message)
+    if not movie_doc:
+        return None
+
+    try:
+        # Upsert keyed on (chat_id, message_id): a re-delivered post is a no-op even if the
+        # unique index hasn't been built yet; only a real insert counts as a new movie
+        res = await movies_col.update_one(
+            {"chat_id": movie_doc["chat_id"], "message_id": movie_doc["message_id"]},
+            {"$setOnInsert": movie_doc},
+            upsert=True
+        )
+        if res.upserted_id is not None:
+            clear_search_cache()
+            add_fuzzy_choices([movie_doc])
+            return movie_doc["title"], movie_doc.get("thumbnail_id")
+    except DuplicateKeyError:
+        pass # Lost a concurrent upsert race to the same post
     except Exception as e:
-        logger.error(f"Save Error: {e}")
+        logger.error("Save Error: %s", e)
     
     return None
 
@@ -673,53 +1182,94 @@ async def auto_group_messenger():
     """ Sends auto messages to all groups every 20 minutes """
     print("✅ Auto Group Messenger Service Started...")
     while True:
-        try:
-            async for group in groups_col.find({}):
-                chat_id = group["_id"]
+        queue = asyncio.Queue(maxsize=100)
+        dead_groups = []
+
+        async def send_worker():
+            while True:
+                chat_id = await queue.get()
                 try:
-                    sent = await app.send_message(chat_id, AUTO_MESSAGE_TEXT)
+                    # Global send budget + FloodWait pause; no fixed sleep between groups
+                    sent = await send_limited(app.send_message, chat_id, AUTO_MESSAGE_TEXT)
                     if sent:
-                        asyncio.create_task(delete_message_later(chat_id, sent.id, delay=AUTO_MSG_DELETE_TIME))
-                except FloodWait as e:
-                    await asyncio.sleep(e.value)
+                        delete_message_later(chat_id, sent.id, delay=AUTO_MSG_DELETE_TIME)
                 except (PeerIdInvalid, UserIsBlocked):
-                    await groups_col.delete_one({"_id": chat_id})
+                    dead_groups.append(chat_id)
                 except Exception:
                     pass
-                await asyncio.sleep(1.5) 
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(send_worker()) for _ in range(10)]
+        try:
+            async for group in groups_col.find({}, {"_id": 1}).batch_size(1000):
+                await queue.put(group["_id"])
+            await queue.join()
         except Exception as e:
-            logger.error(f"Auto Msg Error: {e}")
-        
+            logger.error("Auto Msg Error: %s", e)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        # One write for every stale group found this cycle
+        if dead_groups:
+            try:
+                await groups_col.delete_many({"_id": {"$in": dead_groups}})
+                for chat_id in dead_groups:
+                    logged_groups.pop(chat_id, None)
+            except Exception as e:
+                logger.error("Auto Msg Error: %s", e)
+
         await asyncio.sleep(AUTO_MSG_INTERVAL)
 
+# All 11 progress bar states (0%..100%), built once
+_BARS = tuple(f"[{'■' * i}{'□' * (10 - i)}]" for i in range(11))
+
 async def broadcast_messages(cursor, message_func, status_msg=None, total_users=0):
     """ Robust Broadcast Function with Progress Bar (Used for Auto-Notification) """
     success = 0
     failed = 0
     start_time = time.time()
-    semaphore = asyncio.Semaphore(20) # Controls concurrency
-    active_tasks = set()
+    queue = asyncio.Queue(maxsize=200) # Bounded so the cursor can't run far ahead of the senders
+    dead_ids = [] # Blocked/deleted users, removed in one round trip
 
-    async def send_worker(user_id):
+    async def flush_dead():
+        nonlocal dead_ids
+        batch, dead_ids = dead_ids, []
+        if batch:
+            try:
+                await users_col.delete_many({"_id": {"$in": batch}})
+            except Exception as e:
+                logger.error("Notify Cleanup Error: %s", e)
+            for user_id in batch:
+                started_users.pop(user_id, None)
+
+    async def send_to(user_id):
         nonlocal success, failed
-        async with semaphore:
+        try:
+            await send_limited(message_func, user_id)
+            success += 1
+        except (InputUserDeactivated, UserIsBlocked, PeerIdInvalid):
+            dead_ids.append(user_id)
+            if len(dead_ids) >= 500:
+                await flush_dead()
+            failed += 1
+        except Exception:
+            failed += 1
+
+    async def send_worker():
+        # Persistent worker: 20 of these replace one task per user
+        while True:
+            user_id = await queue.get()
             try:
-                await message_func(user_id)
-                success += 1
-            except FloodWait as e:
-                await asyncio.sleep(e.value)
-                try:
-                    await message_func(user_id)
-                    success += 1
-                except:
-                    failed += 1
-            except (InputUserDeactivated, UserIsBlocked, PeerIdInvalid):
-                await users_col.delete_one({"_id": user_id})
-                failed += 1
-            except Exception:
-                failed += 1
+                await send_to(user_id)
+            finally:
+                queue.task_done()
 
     async def update_status_loop():
+        last_text = ""
+        last_edit_ts = time.monotonic()
         while True:
             await asyncio.sleep(5)
             done = success + failed
@@ -731,7 +1281,7 @@ async def broadcast_messages(cursor, message_func, status_msg=None, total_users=
             speed = done / elapsed
             eta = (total_users - done) / speed if speed > 0 else 0
             
-            progress_bar = f"[{'■' * int(percentage // 10)}{'□' * (10 - int(percentage // 10))}]"
+            progress_bar = _BARS[min(int(percentage // 10), 10)]
             text = (
                 f"🚀 **Broadcasting...**\n\n"
                 f"{progress_bar} **{percentage:.1f}%**\n"
@@ -739,28 +1289,39 @@ async def broadcast_messages(cursor, message_func, status_msg=None, total_users=
                 f"⚡ Speed: `{speed:.1f} u/s`\n"
                 f"⏳ ETA: `{get_readable_time(eta)}`"
             )
-            try:
-                if status_msg:
+            # Skip redraws nobody can see (same text, or less than 5s since the last edit)
+            now = time.monotonic()
+            if status_msg and text != last_text and (now - last_edit_ts) >= 5:
+                try:
                     await (status_msg.edit_caption(text) if status_msg.photo else status_msg.edit_text(text))
-            except: pass
+                    last_text = text
+                    last_edit_ts = time.monotonic()
+                except FloodWait as e:
+                    await asyncio.sleep(e.value)
+                except Exception:
+                    pass
             
-            if done >= total_users and not active_tasks:
+            if done >= total_users:
                 break
 
     updater_task = asyncio.create_task(update_status_loop())
+    workers = [asyncio.create_task(send_worker()) for _ in range(20)]
 
-    async for user in cursor:
-        user_id = user["_id"]
-        task = asyncio.create_task(send_worker(user_id))
-        active_tasks.add(task)
-        task.add_done_callback(active_tasks.discard)
-        if len(active_tasks) > 50:
-            await asyncio.sleep(0.1)
-    
-    while active_tasks:
-        await asyncio.sleep(1)
+    try:
+        async for user in cursor:
+            # Blocks while the queue is full (no polling)
+            await queue.put(user["_id"])
+        await queue.join()
+    except Exception as e:
+        # Runs as a background task: log here instead of leaving an unretrieved exception
+        logger.error("Auto Notify Error: %s", e)
+    finally:
+        for worker in workers:
+            worker.cancel()
+        updater_task.cancel()
+        await asyncio.gather(*workers, updater_task, return_exceptions=True)
+        await flush_dead()
 
-    updater_task.cancel()
     elapsed = time.time() - start_time
     final_text = f"✅ **Broadcast Done!**\nTime: `{get_readable_time(elapsed)}`\nSuccess: {success}\nFailed: {failed}"
     
@@ -771,7 +1332,7 @@ async def broadcast_messages(cursor, message_func, status_msg=None, total_users=
 
 async def auto_broadcast_worker(movie_title, message_id, thumbnail_id=None):
     """ Automatically notifies all users when a new movie is added """
-    download_link = f"https://t.me/{app.me.username}?start=watch_{message_id}"
+    download_link = f"{WATCH_LINK}{message_id}"
     
     download_button = InlineKeyboardMarkup([
         [InlineKeyboardButton("📥 ডাউনলোড করতে ক্লিক করুন", url=download_link)]
@@ -779,7 +1340,7 @@ async def auto_broadcast_worker(movie_title, message_id, thumbnail_id=None):
     
     notification_caption = f"🎬 **নতুন মুভি আপলোড হয়েছে!**\n\n**{movie_title}**\n\nএখনই নিচের বাটনে ক্লিক করে ডাউনলোড করুন! 👇"
     
-    total_users = await users_col.count_documents({"notify": {"$ne": False}})
+    total_users = await users_col.count_documents({"notify": True})
     if total_users == 0: return
 
     status_msg = None
@@ -789,14 +1350,16 @@ async def auto_broadcast_worker(movie_title, message_id, thumbnail_id=None):
             status_msg = await app.send_photo(ADMIN_IDS[0], photo=pic_to_use, caption=f"🚀 **অটো নোটিফিকেশন শুরু...**\n👥 ইউজার: `{total_users}`")
         except: pass
 
-    async def send_func(user_id):
-        if thumbnail_id:
-            msg = await app.send_photo(user_id, photo=thumbnail_id, caption=notification_caption, reply_markup=download_button)
+    # Default args are bound once instead of being looked up per user
+    async def send_func(user_id, _cap=notification_caption, _btn=download_button, _thumb=thumbnail_id):
+        if _thumb:
+            msg = await app.send_photo(user_id, photo=_thumb, caption=_cap, reply_markup=_btn)
         else:
-            msg = await app.send_message(user_id, notification_caption, reply_markup=download_button)
-        if msg: asyncio.create_task(delete_message_later(msg.chat.id, msg.id, delay=86400))
+            msg = await app.send_message(user_id, _cap, reply_markup=_btn)
+        if msg: delete_message_later(msg.chat.id, msg.id, delay=86400)
 
-    cursor = users_col.find({"notify": {"$ne": False}}, {"_id": 1})
+    # Large batches keep the 20 senders fed without a getMore every ~100 users
+    cursor = users_col.find({"notify": True}, {"_id": 1}).batch_size(2000)
     await broadcast_messages(cursor, send_func, status_msg, total_users)
 
 # ==============================================================================
@@ -806,17 +1369,22 @@ async def auto_broadcast_worker(movie_title, message_id, thumbnail_id=None):
 # 1. AUTO SAVE FROM PRIMARY CHANNEL
 @app.on_message(filters.chat(CHANNEL_ID))
 async def save_post(_, msg: Message):
-    title = await process_movie_save(msg)
-    if title:
+    saved = await process_movie_save(msg)
+    if saved:
+        title, thumb = saved
         # Check Global Notify Setting
-        setting = await settings_col.find_one({"key": "global_notify"})
-        if setting and setting.get("value", True):
-            thumb = msg.photo.file_id if msg.photo else (msg.video.thumbs[0].file_id if msg.video and msg.video.thumbs else None)
+        if await get_setting("global_notify"):
             asyncio.create_task(auto_broadcast_worker(title, msg.id, thumb))
 
 # 2. LOG GROUP ACTIVATION
+# chat_id -> last title written (skips the upsert until the title changes)
+logged_groups = LRUCache(maxsize=50_000)
+
 @app.on_message(filters.group, group=10)
 async def log_group(_, msg: Message):
+    if logged_groups.get(msg.chat.id) == msg.chat.title:
+        return
+    logged_groups[msg.chat.id] = msg.chat.title
     await groups_col.update_one(
         {"_id": msg.chat.id}, 
         {"$set": {"title": msg.chat.title, "active": True}}, 
@@ -851,46 +1419,68 @@ async def index_channel_handler(_, msg: Message):
     already_exists = 0
     
     batch_size = 100
-    
+    starts = range(last_msg_id, 0, -batch_size)
+
+    def batch_ids(i):
+        return list(range(i, max(1, i - batch_size + 1) - 1, -1))
+
+    async def fetch_batch(ids):
+        # FloodWait is the backpressure signal; no fixed sleep between batches
+        try:
+            return await app.get_messages(target_chat_id, ids)
+        except FloodWait as e:
+            await asyncio.sleep(e.value + 2)
+            return await app.get_messages(target_chat_id, ids)
+
+    next_fetch = asyncio.create_task(fetch_batch(batch_ids(starts[0]))) if starts else None
+
     try:
-        for i in range(last_msg_id, 0, -batch_size):
+        for n, i in enumerate(starts):
             try:
-                start_id = i
-                end_id = max(1, i - batch_size + 1)
-                ids = list(range(start_id, end_id - 1, -1))
-                
+                ids = batch_ids(i)
+                start_id, end_id = ids[0], ids[-1]
+
                 try:
-                    messages = await app.get_messages(target_chat_id, ids)
-                except FloodWait as e:
-                    await asyncio.sleep(e.value + 2) 
-                    messages = await app.get_messages(target_chat_id, ids)
+                    messages = await next_fetch
                 except Exception as e:
-                    logger.error(f"Fetch Error: {e}")
-                    continue
+                    logger.error("Fetch Error: %s", e)
+                    messages = None
+
+                # Prefetch the next batch while this one is parsed and written
+                next_fetch = asyncio.create_task(fetch_batch(batch_ids(starts[n + 1]))) if n + 1 < len(starts) else None
 
-                if not messages:
+                # Deleted ranges come back all-empty: skip them without touching Mongo
+                live = [m for m in (messages or []) if m and not m.empty]
+                if not live:
                     continue
 
-                for message in messages:
-                    if not message or message.empty:
-                        continue
-                        
+                # One existence query per batch, only over ids that could be saved
+                media_ids = [m.id for m in live if m.photo or m.video or m.document or m.audio]
+                existing_ids = {
+                    doc["message_id"] async for doc in movies_col.find(
+                        {"chat_id": target_chat_id, "message_id": {"$in": media_ids}}, {"message_id": 1, "_id": 0}
+                    )
+                } if media_ids else set()
+
+                new_docs, skipped, exists = await asyncio.to_thread(prepare_movie_docs, live, existing_ids)
+                total_skipped += skipped
+                already_exists += exists
+
+                # One write per batch
+                if new_docs:
                     try:
-                        exists = await movies_col.find_one({"chat_id": target_chat_id, "message_id": message.id})
-                        if exists:
-                            already_exists += 1
-                            continue
-
-                        saved_title = await process_movie_save(message)
-                        if saved_title: 
-                            total_indexed += 1
-                        else:
-                            total_skipped += 1
-                    except Exception as inner_e:
-                        logger.error(f"Save Error: {inner_e}")
-                
-                await asyncio.sleep(1.5)
-                
+                        await movies_col.insert_many(new_docs, ordered=False)
+                        total_indexed += len(new_docs)
+                    except BulkWriteError as bwe:
+                        total_indexed += bwe.details.get("nInserted", 0)
+                        write_errors = bwe.details.get("writeErrors", [])
+                        duplicates = sum(1 for err in write_errors if err.get("code") == 11000)
+                        already_exists += duplicates
+                        if duplicates < len(write_errors):
+                            logger.error("Bulk Save Error: %s", write_errors[0])
+                    clear_search_cache()
+                    add_fuzzy_choices(new_docs)
+
                 if i % 200 == 0:
                     try: 
                         await status_msg.edit_text(
@@ -903,7 +1493,7 @@ async def index_channel_handler(_, msg: Message):
                     except: pass
                     
             except Exception as e:
-                logger.error(f"Batch Loop Error: {e}")
+                logger.error("Batch Loop Error: %s", e)
                 pass
 
     except Exception as e:
@@ -917,46 +1507,73 @@ async def index_channel_handler(_, msg: Message):
         f"🗑 বাদ দেওয়া হয়েছে: **{total_skipped}** টি"
     )
 
+# Home menu keyboard: same for every user, built once the bot link is known
+_home_markup = None
+
+def home_markup():
+    global _home_markup
+    if _home_markup is None:
+        _home_markup = InlineKeyboardMarkup([
+            [InlineKeyboardButton("🔰 ADD ME TO YOUR GROUP 🔰", url=ADD_GROUP_LINK)],
+            [
+                InlineKeyboardButton("HELP 📢", callback_data="help_menu"),
+                InlineKeyboardButton("ABOUT 📘", callback_data="about_menu")
+            ],
+            [
+                InlineKeyboardButton("TOP SEARCHING ⭐", callback_data="top_searching"),
+                InlineKeyboardButton("UPGRADE 🎟️", url=UPDATE_CHANNEL)
+            ]
+        ])
+    return _home_markup
+
 # 4. START COMMAND (Logic Hub)
-user_last_start_time = {}
+# Anti-Spam: users who sent /start in the last 2 seconds (entries expire on their own)
+user_last_start_time = TTLCache(maxsize=100_000, ttl=2)
+# Users already upserted by /start recently (skips a DB write on repeat /start)
+started_users = TTLCache(maxsize=100_000, ttl=3600)
 
 @app.on_message(filters.command("start"))
 async def start(_, msg: Message):
     user_id = msg.from_user.id
-    current_time = datetime.now(timezone.utc)
     
     if user_id in user_last_start_time:
-        if (current_time - user_last_start_time[user_id]) < timedelta(seconds=2):
-            return
-    user_last_start_time[user_id] = current_time
-
-    await users_col.update_one(
-        {"_id": msg.from_user.id},
-        {"$set": {"joined": datetime.now(timezone.utc), "notify": True}},
-        upsert=True
-    )
+        return
+    user_last_start_time[user_id] = True
+
+    # One upsert per user per hour is enough; 'joined' is only written on first insert
+    if user_id not in started_users:
+        await users_col.update_one(
+            {"_id": user_id},
+            {"$setOnInsert": {"joined": datetime.now(timezone.utc), "notify": True}},
+            upsert=True
+        )
+        started_users[user_id] = True
 
     if len(msg.command) > 1:
         argument = msg.command[1]
         
-        protect_setting = await settings_col.find_one({"key": "protect_content"})
-        should_protect = protect_setting.get("value", True) if protect_setting else True
+        should_protect = await get_setting("protect_content")
         
         # --- A. VERIFIED LINK HANDLER ---
         if argument.startswith("verified_"):
             token = argument.replace("verified_", "")
-            verify_data = await verify_col.find_one({"token": token})
+            # Claim the token in one atomic call (step 2 -> 3), so a double tap can't send
+            # the file twice; it is only deleted once the copy has gone through
+            verify_data = await verify_col.find_one_and_update(
+                {"token": token, "user_id": user_id, "step": 2},
+                {"$set": {"step": 3}},
+                projection={"movie_id": 1, "chat_id": 1}
+            )
 
             if not verify_data:
-                await msg.reply("❌ **লিংকটি মেয়াদোত্তীর্ণ!**\nদয়া করে আবার সার্চ করুন।", quote=True)
-                return
-            
-            if verify_data["user_id"] != user_id:
-                await msg.reply("⚠️ এই লিংকটি আপনার জন্য নয়!", quote=True)
-                return
-
-            if verify_data.get("step") != 2:
-                await msg.reply("⚠️ **ভেরিফিকেশন অসম্পূর্ণ!**", quote=True)
+                # Rare path: look the token up only to pick the right error
+                other = await verify_col.find_one({"token": token}, {"user_id": 1})
+                if not other:
+                    await msg.reply("❌ **লিংকটি মেয়াদোত্তীর্ণ!**\nদয়া করে আবার সার্চ করুন।", quote=True)
+                elif other["user_id"] != user_id:
+                    await msg.reply("⚠️ এই লিংকটি আপনার জন্য নয়!", quote=True)
+                else:
+                    await msg.reply("⚠️ **ভেরিফিকেশন অসম্পূর্ণ!**", quote=True)
                 return
 
             message_id = verify_data["movie_id"]
@@ -965,37 +1582,39 @@ async def start(_, msg: Message):
             source_chat_id = verify_data.get("chat_id", CHANNEL_ID)
 
             try:
-                await app.copy_message(
-                    chat_id=msg.chat.id,        
-                    from_chat_id=source_chat_id,    
-                    message_id=message_id,      
-                    protect_content=should_protect 
-                )
-                
+                await send_movie_file(msg.chat.id, source_chat_id, message_id, should_protect)
+            except Exception as e:
+                # Release the claim so the same link works again without redoing verification
+                try:
+                    await verify_col.update_one({"token": token}, {"$set": {"step": 2}})
+                except Exception as db_err:
+                    logger.error("Verify Release Error: %s", db_err)
+                await msg.reply(f"❌ মুভিটি খুঁজে পাওয়া যাচ্ছে না। Error: {e}")
+                return
+
+            try:
                 await verify_col.delete_one({"token": token})
-                await movies_col.update_one({"message_id": message_id}, {"$inc": {"views_count": 1}})
-                
+            except Exception as e:
+                logger.error("Verify Cleanup Error: %s", e) # TTL index removes it within the hour
+
+            view_buffer[message_id] += 1
+
+            try:
                 action_buttons = InlineKeyboardMarkup([
                     [InlineKeyboardButton("⚠️ রিপোর্ট / সমস্যা", callback_data=f"report_{message_id}")]
                 ])
                 suc_msg = await msg.reply("✅ **ভেরিফিকেশন সফল!**\nআপনার ফাইল উপরে দেওয়া হয়েছে।", reply_markup=action_buttons)
-                asyncio.create_task(delete_message_later(suc_msg.chat.id, suc_msg.id, 60))
-                
+                delete_message_later(suc_msg.chat.id, suc_msg.id, 60)
             except Exception as e:
-                await msg.reply(f"❌ মুভিটি খুঁজে পাওয়া যাচ্ছে না। Error: {e}")
+                # The file itself was delivered; only the confirmation failed
+                logger.error("Verify Reply Error: %s", e)
             return
             
         # --- B. DIRECT/NOTIFICATION LINK HANDLER ---
         elif argument.startswith("watch_"):
             message_id = int(argument.replace("watch_", ""))
-            
-            movie = await movies_col.find_one({"message_id": message_id})
-            
-            # FIX: Use .get() to avoid KeyError on old entries
-            source_chat_id = movie.get("chat_id", CHANNEL_ID) if movie else CHANNEL_ID
 
-            verify_setting = await settings_col.find_one({"key": "verification_mode"})
-            is_verify_on = verify_setting.get("value", True) if verify_setting else True
+            is_verify_on = await get_setting("verification_mode")
             
             if is_verify_on:
                 verify_link = await create_verification_link(message_id, user_id)
@@ -1006,15 +1625,14 @@ async def start(_, msg: Message):
                     quote=True
                 )
                 return
-            
+
+            # Cached lookup; the view is counted in view_buffer, so a burst of
+            # clicks on a new upload becomes one $inc per flush instead of one write each
+            source_chat_id = await get_source_chat(message_id)
+
             try:
-                await app.copy_message(
-                    chat_id=msg.chat.id,
-                    from_chat_id=source_chat_id,
-                    message_id=message_id,
-                    protect_content=should_protect
-                )
-                await movies_col.update_one({"message_id": message_id}, {"$inc": {"views_count": 1}})
+                await send_movie_file(msg.chat.id, source_chat_id, message_id, should_protect)
+                view_buffer[message_id] += 1
             except:
                 await msg.reply("❌ ফাইলটি পাওয়া যাচ্ছে না।")
             return
@@ -1022,28 +1640,15 @@ async def start(_, msg: Message):
     # Normal Welcome Message
     greeting = get_greeting()
     user_mention = msg.from_user.mention
-    bot_username = app.me.username
     
     start_caption = f"""
 HEY {user_mention}, {greeting}
 
-🤖 **I AM {app.me.first_name},** THE MOST
+🤖 **I AM {BOT_FIRST_NAME},** THE MOST
 POWERFUL AUTO FILTER BOT WITH 
 WEB VERIFICATION SYSTEM.
 """
-    btns = InlineKeyboardMarkup([
-        [InlineKeyboardButton("🔰 ADD ME TO YOUR GROUP 🔰", url=f"https://t.me/{bot_username}?startgroup=true")],
-        [
-            InlineKeyboardButton("HELP 📢", callback_data="help_menu"),
-            InlineKeyboardButton("ABOUT 📘", callback_data="about_menu")
-        ],
-        [
-            InlineKeyboardButton("TOP SEARCHING ⭐", callback_data="top_searching"),
-            InlineKeyboardButton("UPGRADE 🎟️", url=UPDATE_CHANNEL)
-        ]
-    ])
-
-    await msg.reply_photo(photo=START_PIC, caption=start_caption, reply_markup=btns)
+    await msg.reply_photo(photo=START_PIC, caption=start_caption, reply_markup=home_markup())
 
 # ------------------- ADMIN COMMANDS -------------------
 
@@ -1055,7 +1660,7 @@ async def toggle_protection(_, msg: Message):
         return
     
     new_status = True if msg.command[1] == "on" else False
-    await settings_col.update_one({"key": "protect_content"}, {"$set": {"value": new_status}}, upsert=True)
+    await set_setting("protect_content", new_status)
     await msg.reply(f"🔒 **ফাইল প্রোটেকশন {'চালু' if new_status else 'বন্ধ'} করা হয়েছে!**")
 
 # Verify Mode Toggle
@@ -1066,7 +1671,7 @@ async def toggle_verification(_, msg: Message):
         return
     
     new_status = True if msg.command[1] == "on" else False
-    await settings_col.update_one({"key": "verification_mode"}, {"$set": {"value": new_status}}, upsert=True)
+    await set_setting("verification_mode", new_status)
     await msg.reply(f"🌍 **ভেরিফিকেশন মোড {'চালু' if new_status else 'বন্ধ'} করা হয়েছে!**")
 
 # ==============================================================================
@@ -1086,54 +1691,106 @@ async def broadcast_handler(bot, m):
     
     # ডাটাবেস থেকে সব ইউজার নেওয়া
     total_users = await users_col.count_documents({})
-    all_users = users_col.find({})
+    # শুধু _id, বড় batch-এ (covered _id index scan)
+    all_users = users_col.find({}, {"_id": 1}).batch_size(1000).hint([("_id", ASCENDING)])
     
     done = 0
     blocked = 0
     deleted = 0
     failed = 0
-    
-    async for user in all_users:
-        user_id = user.get("_id")
-        
-        try:
-            # মেসেজটি কপি করে পাঠানো (Forward Tag ছাড়া)
-            await broadcast_msg.copy(chat_id=user_id)
-            done += 1
-            
-        except FloodWait as e:
-            # টেলিগ্রাম লিমিট দিলে অপেক্ষা করবে
-            await asyncio.sleep(e.value)
+
+    dead_ids = [] # ডিলিটেড একাউন্ট, একসাথে মুছে ফেলা হবে
+
+    async def flush_dead():
+        nonlocal dead_ids
+        batch, dead_ids = dead_ids, []
+        if batch:
+            try:
+                await users_col.delete_many({"_id": {"$in": batch}})
+            except Exception as e:
+                logger.error("Broadcast Cleanup Error: %s", e)
+            for user_id in batch:
+                started_users.pop(user_id, None)
+
+    queue = asyncio.Queue(maxsize=500)
+
+    async def copy_to(user_id):
+        # মেসেজটি কপি করে পাঠানো (Forward Tag ছাড়া)
+        # টেলিগ্রাম লিমিট দিলে send_limited সব পাঠানো একসাথে থামিয়ে দেবে
+        await send_limited(broadcast_msg.copy, chat_id=user_id)
+
+    async def send_worker():
+        nonlocal done, blocked, deleted, failed
+        while True:
+            user_id = await queue.get()
             try:
-                await broadcast_msg.copy(chat_id=user_id)
+                await copy_to(user_id)
                 done += 1
+            except UserIsBlocked:
+                # ইউজার যদি বট ব্লক করে রাখে
+                blocked += 1
+            except InputUserDeactivated:
+                # ইউজার যদি একাউন্ট ডিলিট করে দেয়
+                deleted += 1
+                dead_ids.append(user_id)
+                if len(dead_ids) >= 500:
+                    await flush_dead()
             except Exception:
                 failed += 1
-                
-        except UserIsBlocked:
-            # ইউজার যদি বট ব্লক করে রাখে
-            blocked += 1
-            
-        except InputUserDeactivated:
-            # ইউজার যদি একাউন্ট ডিলিট করে দেয়
-            deleted += 1
-            await users_col.delete_one({"_id": user_id})
-            
-        except Exception:
-            failed += 1
-            
-        # প্রতি ২০ জন পর পর স্ট্যাটাস আপডেট করবে
-        if done % 20 == 0:
-            await status_msg.edit_text(
-                f"📢 **ব্রডকাস্ট চলছে...**\n\n"
-                f"✅ সফল: `{done}`\n"
-                f"❌ ব্লকড: `{blocked}`\n"
-                f"🗑 ডিলিটেড: `{deleted}`\n"
-                f"⚠️ ফেইলড: `{failed}`\n"
-                f"👥 মোট ইউজার: `{total_users}`"
-            )
+            finally:
+                queue.task_done()
+
+    finished = asyncio.Event()
+
+    async def status_updater():
+        # প্রতি ৫ সেকেন্ডে একবার স্ট্যাটাস আপডেট (পাঠানোর লুপের বাইরে)
+        last_counts = None
+        while not finished.is_set():
+            try:
+                await asyncio.wait_for(finished.wait(), timeout=5)
+                break
+            except asyncio.TimeoutError:
+                pass
+            counts = (done, blocked, deleted, failed)
+            if counts == last_counts:
+                continue # Nothing moved (e.g. FloodWait pause): Telegram would reject the edit anyway
+            try:
+                await status_msg.edit_text(
+                    f"📢 **ব্রডকাস্ট চলছে...**\n\n"
+                    f"✅ সফল: `{done}`\n"
+                    f"❌ ব্লকড: `{blocked}`\n"
+                    f"🗑 ডিলিটেড: `{deleted}`\n"
+                    f"⚠️ ফেইলড: `{failed}`\n"
+                    f"👥 মোট ইউজার: `{total_users}`"
+                )
+                last_counts = counts
+            except MessageNotModified:
+                pass
+            except FloodWait as e:
+                await asyncio.sleep(e.value)
+            except Exception:
+                pass
+
+    updater_task = asyncio.create_task(status_updater())
 
-    time_taken = datetime.timedelta(seconds=int(time.time() - start_time))
+    # ২৫টি worker একসাথে পাঠাবে, send_limited() দিয়ে ৩০/সেকেন্ড সীমার মধ্যে
+    workers = [asyncio.create_task(send_worker()) for _ in range(25)]
+    try:
+        async for user in all_users:
+            await queue.put(user.get("_id"))
+        await queue.join()
+    except Exception as e:
+        # কার্সর এরর হলেও worker ও স্ট্যাটাস টাস্ক বন্ধ করতে হবে
+        logger.error("Broadcast Error: %s", e)
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        await flush_dead()
+        finished.set()
+        await updater_task
+
+    time_taken = timedelta(seconds=int(time.time() - start_time))
     
     # শেষ হলে ফাইনাল রিপোর্ট
     await status_msg.edit_text(
@@ -1148,9 +1805,12 @@ async def broadcast_handler(bot, m):
 # Stats Command
 @app.on_message(filters.command("stats") & filters.user(ADMIN_IDS))
 async def stats(_, msg: Message):
-    total_groups = await groups_col.count_documents({})
-    total_users = await users_col.count_documents({})
-    total_movies = await movies_col.count_documents({})
+    # Metadata counts (O(1)), fetched concurrently
+    total_groups, total_users, total_movies = await asyncio.gather(
+        groups_col.estimated_document_count(),
+        users_col.estimated_document_count(),
+        movies_col.estimated_document_count()
+    )
     
     stats_msg = await msg.reply(
         f"📊 **Bot Statistics**\n\n"
@@ -1158,7 +1818,7 @@ async def stats(_, msg: Message):
         f"👥 Groups: {total_groups}\n"
         f"🎬 Movies: {total_movies}"
     )
-    asyncio.create_task(delete_message_later(stats_msg.chat.id, stats_msg.id))
+    delete_message_later(stats_msg.chat.id, stats_msg.id)
 
 # Notify Toggle
 @app.on_message(filters.command("notify") & filters.user(ADMIN_IDS))
@@ -1167,7 +1827,7 @@ async def notify_command(_, msg: Message):
         await msg.reply("ব্যবহার: /notify on অথবা /notify off")
         return
     new_value = True if msg.command[1] == "on" else False
-    await settings_col.update_one({"key": "global_notify"}, {"$set": {"value": new_value}}, upsert=True)
+    await set_setting("global_notify", new_value)
     await msg.reply(f"✅ গ্লোবাল নোটিফিকেশন {'চালু' if new_value else 'বন্ধ'} করা হয়েছে!")
 
 # Feedback
@@ -1182,9 +1842,13 @@ async def feedback(_, msg: Message):
         "time": datetime.now(timezone.utc)
     })
     m = await msg.reply("আপনার মতামতের জন্য ধন্যবাদ!")
-    asyncio.create_task(delete_message_later(m.chat.id, m.id))
+    delete_message_later(m.chat.id, m.id)
 
 # ------------------- SAFE: Bulk Delete Feature (With Preview) -------------------
+def delete_filter(title):
+    """ Every word of the title must appear (uses the text index instead of a regex scan) """
+    return {"$text": {"$search": build_text_search(title)}}
+
 @app.on_message(filters.command("delete_movie") & filters.user(ADMIN_IDS))
 async def delete_specific_movie(_, msg: Message):
     if len(msg.command) < 2:
@@ -1192,7 +1856,12 @@ async def delete_specific_movie(_, msg: Message):
         return
     title = msg.text.split(None, 1)[1].strip()
     
-    matches = await movies_col.find({"title": {"$regex": re.escape(title), "$options": "i"}}).to_list(length=100)
+    try:
+        matches = await movies_col.find(delete_filter(title), {"title": 1, "_id": 0}).to_list(length=100)
+    except OperationFailure as e:
+        # delete_filter needs the text index
+        await msg.reply(f"❌ এরর: {e}")
+        return
     
     if not matches:
         await msg.reply(f"❌ **'{title}'** নামে কোনো ফাইল পাওয়া যায়নি।")
@@ -1207,9 +1876,8 @@ async def delete_specific_movie(_, msg: Message):
         
     text += f"\n\n🔥 **মোট ফাইল:** {len(matches)} টি\nআপনি কি নিশ্চিত যে আপনি এগুলো সব ডিলিট করতে চান?"
     
-    encoded_title = urllib.parse.quote_plus(title)
     btn = InlineKeyboardMarkup([
-        [InlineKeyboardButton("✅ হ্যাঁ, সব ডিলিট করুন", callback_data=f"confirm_del_{encoded_title}")],
+        [InlineKeyboardButton("✅ হ্যাঁ, সব ডিলিট করুন", callback_data=f"confirm_del_{stash_payload(title)}")],
         [InlineKeyboardButton("❌ না, বাতিল করুন", callback_data="cancel_del")]
     ])
     
@@ -1242,40 +1910,111 @@ async def request_movie(_, msg: Message):
     })
     
     m = await msg.reply(f"**'{movie_name}'** অনুরোধ সফলভাবে জমা হয়েছে।", quote=True)
-    asyncio.create_task(delete_message_later(m.chat.id, m.id))
+    delete_message_later(m.chat.id, m.id)
     
     encoded_name = urllib.parse.quote_plus(movie_name)
     admin_btns = InlineKeyboardMarkup([[
         InlineKeyboardButton("✅ সম্পন্ন", callback_data=f"req_fulfilled_{user_id}_{encoded_name}"),
         InlineKeyboardButton("❌ বাতিল", callback_data=f"req_rejected_{user_id}_{encoded_name}")
     ]])
-    for admin_id in ADMIN_IDS:
-        try:
-            await app.send_message(admin_id, f"❗ *নতুন অনুরোধ!*\n🎬 `{movie_name}`\n👤 [{username}](tg://user?id={user_id})", reply_markup=admin_btns)
-        except: pass
+    await notify_admins(f"❗ *নতুন অনুরোধ!*\n🎬 `{movie_name}`\n👤 [{username}](tg://user?id={user_id})", admin_btns)
+
+# Top 10 by views, shared by every click for 60s (links stay per-user)
+_top_cache = [0.0, []] # [computed_at, movies]
+
+async def get_top_movies():
+    now = time.monotonic()
+    if now - _top_cache[0] >= 60:
+        # Walks the views_count index backwards (a single-field index needs no -1 twin)
+        _top_cache[1] = await movies_col.find(
+            {}, {"_id": 0, "title": 1, "message_id": 1, "chat_id": 1, "views_count": 1}
+        ).sort("views_count", -1).hint([("views_count", ASCENDING)]).limit(10).to_list(length=10)
+        _top_cache[0] = now
+    return _top_cache[1]
 
 # ------------------- SMART SEARCH HANDLER -------------------
 
-@app.on_message(filters.text & ~filters.command(["start", "index", "delete_movie", "delete_all_movies", "protect", "verify", "broadcast", "notify", "stats", "feedback", "request"]) & (filters.group | filters.private))
+# Commands with their own handlers (never treated as a search)
+_EXCLUDED_CMDS = frozenset({
+    "start", "index", "delete_movie", "delete_all_movies", "protect", "verify",
+    "broadcast", "notify", "stats", "feedback", "request"
+})
+
+def _is_search_text(_, __, msg: Message):
+    text = msg.text
+    if not text:
+        return False
+    if text[0] != "/":
+        return True # Plain text: no command parsing at all
+    command = text[1:].split(maxsplit=1)
+    return not command or command[0].split("@")[0].lower() not in _EXCLUDED_CMDS
+
+search_text = filters.create(_is_search_text)
+
+@app.on_message(search_text & (filters.group | filters.private))
 async def search(_, msg: Message):
     query = msg.text.strip()
-    if not query: return
-    
-    if msg.chat.type in ["group", "supergroup"]:
-        await groups_col.update_one({"_id": msg.chat.id}, {"$set": {"title": msg.chat.title, "active": True}}, upsert=True)
-        # Filters for Groups
+    if not query or not msg.from_user: return
+
+    if msg.chat.type in (ChatType.GROUP, ChatType.SUPERGROUP):
+        # Group row is upserted by log_group (group=10), no second write here
+        # Filters for Groups (checked before queueing, so ignored chatter costs no task)
         if len(query) < 2 or msg.reply_to_message or msg.from_user.is_bot: return
         if query.startswith("/"): return
 
+    # Hand off to the chat's own queue: one chat's slow search (TMDB, fuzzy) no longer holds up the others
+    queue = chat_queues.get(msg.chat.id)
+    if queue is None:
+        queue = chat_queues[msg.chat.id] = asyncio.Queue()
+        task = asyncio.create_task(chat_search_worker(msg.chat.id, queue))
+        # Keep a strong reference until the worker finishes (the loop only holds a weak one)
+        search_tasks.add(task)
+        task.add_done_callback(search_tasks.discard)
+    queue.put_nowait(msg)
+
+# user_id -> last search query (pagination/filter buttons read this instead of Mongo)
+LAST_QUERY = TTLCache(maxsize=100_000, ttl=1800)
+
+async def get_last_query(user_id):
+    query = LAST_QUERY.get(user_id)
+    if query is None:
+        # Miss (restart/expiry): fall back to the copy saved by search
+        user_data = await users_col.find_one({"_id": user_id}, {"last_query": 1})
+        query = user_data.get("last_query") if user_data else None
+        if query:
+            LAST_QUERY[user_id] = query
+    return query
+
+# Per-chat search queues: serial within a chat, concurrent across chats
+chat_queues = {}
+search_tasks = set() # Running chat_search_worker tasks
+search_semaphore = asyncio.Semaphore(64) # Global cap on searches in flight
+
+async def chat_search_worker(chat_id, queue):
+    while not queue.empty():
+        msg = queue.get_nowait()
+        async with search_semaphore:
+            try:
+                await run_search(msg)
+            except Exception as e:
+                logger.error("Search Error: %s", e)
+    # No await between the empty() check and here, so nothing can be enqueued in between
+    chat_queues.pop(chat_id, None)
+
+async def run_search(msg: Message):
+    query = msg.text.strip() # Group / sender filters already ran in search()
     user_id = msg.from_user.id
     
-    await users_col.update_one(
-        {"_id": user_id},
-        {"$set": {"last_query": query}, "$setOnInsert": {"joined": datetime.now(timezone.utc)}},
-        upsert=True
+    LAST_QUERY[user_id] = query
+    # The single user write overlaps with the "Searching..." reply
+    _, loading_message = await asyncio.gather(
+        users_col.update_one(
+            {"_id": user_id},
+            {"$set": {"last_query": query}, "$setOnInsert": {"joined": datetime.now(timezone.utc), "notify": True}},
+            upsert=True
+        ),
+        msg.reply("🔎 <b>Searching...</b>", quote=True)
     )
-
-    loading_message = await msg.reply("🔎 <b>Searching...</b>", quote=True)
     
     results, total_count, search_source, cleaned_query, tmdb_detected_title = await get_search_results(query, offset=0)
 
@@ -1288,10 +2027,9 @@ async def search(_, msg: Message):
 
     await loading_message.delete()
     final_query = tmdb_detected_title if tmdb_detected_title else cleaned_query
-    encoded_final_query = urllib.parse.quote_plus(final_query)
     Google_Search_url = "https://www.google.com/search?q=" + urllib.parse.quote(final_query)
     
-    req_btn = InlineKeyboardButton(f"✅ রিকোয়েস্ট করুন", callback_data=f"request_movie_{user_id}_{encoded_final_query}")
+    req_btn = InlineKeyboardButton(f"✅ রিকোয়েস্ট করুন", callback_data=f"request_movie_{stash_payload((user_id, final_query))}")
     google_btn = InlineKeyboardButton("🌐 গুগলে দেখুন", url=Google_Search_url)
     
     alert_text = (
@@ -1301,7 +2039,7 @@ async def search(_, msg: Message):
     ) if tmdb_detected_title else f"❌ দুঃখিত! **'{cleaned_query}'** পাওয়া যায়নি。"
 
     alert = await msg.reply_text(alert_text, reply_markup=InlineKeyboardMarkup([[req_btn], [google_btn]]), quote=True)
-    asyncio.create_task(delete_message_later(alert.chat.id, alert.id))
+    delete_message_later(alert.chat.id, alert.id)
 
     encoded_query_admin = urllib.parse.quote_plus(query)
     admin_btns = InlineKeyboardMarkup([
@@ -1326,32 +2064,36 @@ async def search(_, msg: Message):
         f"ইউজার মুভিটি খুঁজে পায়নি। আপনি চাইলে এখনই আপলোড করে নিচের বাটন দিয়ে জানাতে পারেন।"
     )
 
-    for admin_id in ADMIN_IDS:
-        try:
-            await app.send_message(admin_id, admin_msg, reply_markup=admin_btns)
-        except Exception:
-            pass
+    await notify_admins(admin_msg, admin_btns)
+
+# Filter row under every result page (shared, never mutated)
+FILTER_ROW = [
+    InlineKeyboardButton("QUALITY", callback_data="filter_quality"),
+    InlineKeyboardButton("LANGUAGE", callback_data="filter_lang"),
+    InlineKeyboardButton("SEASON", callback_data="filter_season")
+]
 
 async def send_results(msg, results, total_count, offset=0, header="🎬 আপনার মুভি পাওয়া গেছে:", from_callback=False):
     """ Fixed Function: Handles buttons and correct pagination editing """
     
-    setting = await settings_col.find_one({"key": "verification_mode"})
-    is_verify_on = setting.get("value", True) if setting else True
+    is_verify_on = await get_setting("verification_mode")
     
     buttons = []
     user_id = msg.chat.id
     if msg.from_user:
         user_id = msg.from_user.id
 
-    for movie in results:
+    # All links for the page at once instead of one await per result
+    if is_verify_on:
+        links = await asyncio.gather(*(
+            create_verification_link(movie['message_id'], user_id, movie.get('chat_id', CHANNEL_ID))
+            for movie in results
+        ))
+    else:
+        links = [f"{WATCH_LINK}{movie['message_id']}" for movie in results]
+
+    for movie, link in zip(results, links):
         title = movie.get('title') or movie.get('original_title')
-        mid = movie['message_id']
-        
-        if is_verify_on:
-            link = await create_verification_link(mid, user_id)
-        else:
-            bot_username = app.me.username
-            link = f"https://t.me/{bot_username}?start=watch_{mid}"
         
         buttons.append([
             InlineKeyboardButton(
@@ -1360,11 +2102,7 @@ async def send_results(msg, results, total_count, offset=0, header="🎬 আপ
             )
         ])
 
-    buttons.append([
-        InlineKeyboardButton("QUALITY", callback_data="filter_quality"),
-        InlineKeyboardButton("LANGUAGE", callback_data="filter_lang"),
-        InlineKeyboardButton("SEASON", callback_data="filter_season")
-    ])
+    buttons.append(FILTER_ROW)
 
     pagination_buttons = []
     current_page = (offset // RESULTS_COUNT) + 1
@@ -1390,42 +2128,45 @@ async def send_results(msg, results, total_count, offset=0, header="🎬 আপ
     try:
         # FIX: If it is a callback (editing), use edit_text. Else reply.
         if from_callback:
-             await msg.edit_text(final_text, reply_markup=InlineKeyboardMarkup(buttons))
+             await send_limited(msg.edit_text, final_text, reply_markup=InlineKeyboardMarkup(buttons))
         else:
-             m = await msg.reply(final_text, reply_markup=InlineKeyboardMarkup(buttons), quote=True)
-             asyncio.create_task(delete_message_later(m.chat.id, m.id))
+             m = await send_limited(msg.reply, final_text, reply_markup=InlineKeyboardMarkup(buttons), quote=True)
+             delete_message_later(m.chat.id, m.id)
     except Exception as e:
-        logger.error(f"Send Results Error: {e}")
+        logger.error("Send Results Error: %s", e)
 
 # ==============================================================================
 #                           CALLBACK HANDLER
 # ==============================================================================
 
-@app.on_callback_query()
-async def callback_handler(_, cq: CallbackQuery):
-    data = cq.data
-    user_id = cq.from_user.id
-    
-    try:
-        if data == "home_menu":
-            btns = InlineKeyboardMarkup([
-                [InlineKeyboardButton("🔰 ADD ME TO YOUR GROUP 🔰", url=f"https://t.me/{app.me.username}?startgroup=true")],
-                [
-                    InlineKeyboardButton("HELP 📢", callback_data="help_menu"),
-                    InlineKeyboardButton("ABOUT 📘", callback_data="about_menu")
-                ],
-                [
-                    InlineKeyboardButton("TOP SEARCHING ⭐", callback_data="top_searching"),
-                    InlineKeyboardButton("UPGRADE 🎟️", url=UPDATE_CHANNEL)
-                ]
-            ])
-            await cq.message.edit_caption(
-                caption=f"HEY {cq.from_user.mention}, {get_greeting()}\n\n🤖 **I AM {app.me.first_name},** THE MOST\nPOWERFUL AUTO FILTER BOT WITH \nWEB VERIFICATION SYSTEM.",
-                reply_markup=btns
-            )
-        
-        elif data == "help_menu":
-            help_text = """
+# ------------------- CALLBACK HANDLERS -------------------
+
+# Static keyboards, built once at import instead of on every click
+BACK_HOME_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back", callback_data="home_menu")]])
+QUALITY_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("480p", callback_data="add_filter_480p"), InlineKeyboardButton("720p", callback_data="add_filter_720p")],
+    [InlineKeyboardButton("1080p", callback_data="add_filter_1080p"), InlineKeyboardButton("4K / 2160p", callback_data="add_filter_4k")],
+    [InlineKeyboardButton("🔙 Back to Results", callback_data="back_to_search")]
+])
+LANG_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("Hindi", callback_data="add_filter_Hindi"), InlineKeyboardButton("Bengali", callback_data="add_filter_Bengali")],
+    [InlineKeyboardButton("English", callback_data="add_filter_English"), InlineKeyboardButton("Tamil", callback_data="add_filter_Tamil")],
+    [InlineKeyboardButton("🔙 Back to Results", callback_data="back_to_search")]
+])
+SEASON_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("Season 1", callback_data="add_filter_S01"), InlineKeyboardButton("Season 2", callback_data="add_filter_S02")],
+    [InlineKeyboardButton("Season 3", callback_data="add_filter_S03"), InlineKeyboardButton("Season 4", callback_data="add_filter_S04")],
+    [InlineKeyboardButton("🔙 Back to Results", callback_data="back_to_search")]
+])
+
+async def cb_home_menu(cq, data, user_id):
+    await cq.message.edit_caption(
+        caption=f"HEY {cq.from_user.mention}, {get_greeting()}\n\n🤖 **I AM {BOT_FIRST_NAME},** THE MOST\nPOWERFUL AUTO FILTER BOT WITH \nWEB VERIFICATION SYSTEM.",
+        reply_markup=home_markup()
+    )
+
+async def cb_help_menu(cq, data, user_id):
+    help_text = """
 **📢 HELP MENU**
 
 1. **Search:** Just type the movie name.
@@ -1436,245 +2177,339 @@ async def callback_handler(_, cq: CallbackQuery):
    /stats - Admin only stats
    /request <name> - Manual request
 """
-            await cq.message.edit_caption(caption=help_text, reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back", callback_data="home_menu")]]))
-        
-        elif data == "about_menu":
-            about_text = f"""
+    await cq.message.edit_caption(caption=help_text, reply_markup=BACK_HOME_MARKUP)
+
+async def cb_about_menu(cq, data, user_id):
+    about_text = f"""
 **📘 ABOUT BOT**
 
-🤖 **Name:** {app.me.first_name}
+🤖 **Name:** {BOT_FIRST_NAME}
 🛠 **Language:** Python 3
-📚 **Library:** Pyrogram & Motor
+📚 **Library:** Pyrogram & PyMongo Async
 📡 **Server:** Koyeb / VPS
 👨‍💻 **Developer:** Ctgmovies23
 """
-            await cq.message.edit_caption(caption=about_text, reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back", callback_data="home_menu")]]))
-
-        elif data == "top_searching":
-            top_movies = await movies_col.find().sort("views_count", -1).limit(10).to_list(length=10)
-            
-            if not top_movies:
-                await cq.answer("⚠️ No popular movies found yet!", show_alert=True)
-                return
-            
-            msg_text = "⭐ **TOP 10 MOST SEARCHED MOVIES:**\n\n"
-            buttons = []
-            setting = await settings_col.find_one({"key": "verification_mode"})
-            is_verify_on = setting.get("value", True) if setting else True
-
-            for idx, movie in enumerate(top_movies, 1):
-                title = movie.get('title', 'Unknown')
-                mid = movie['message_id']
-                views = movie.get('views_count', 0)
-                
-                link = await create_verification_link(mid, user_id) if is_verify_on else f"https://t.me/{app.me.username}?start=watch_{mid}"
-                
-                msg_text += f"{idx}. {title} ({views} views)\n"
-                buttons.append([InlineKeyboardButton(f"{idx}. {title}", url=link)])
-            
-            buttons.append([InlineKeyboardButton("🔙 Back", callback_data="home_menu")])
-            
-            await cq.message.edit_caption(caption=msg_text, reply_markup=InlineKeyboardMarkup(buttons))
+    await cq.message.edit_caption(caption=about_text, reply_markup=BACK_HOME_MARKUP)
 
-        # --- FIX: PAGINATION HANDLER (IN-PLACE EDIT) ---
-        elif data.startswith("next_page_") or data.startswith("prev_page_"):
-            user_data = await users_col.find_one({"_id": user_id})
-            if not user_data or "last_query" not in user_data:
-                await cq.answer("⚠️ সেশন এক্সপায়ার হয়েছে। আবার সার্চ করুন।", show_alert=True)
-                return
-            
-            last_query = user_data["last_query"]
-            current_offset = int(data.split("_")[2])
-            
-            if "next" in data:
-                new_offset = current_offset + RESULTS_COUNT
-            else:
-                new_offset = max(0, current_offset - RESULTS_COUNT)
-            
-            results, total_count, _, _, _ = await get_search_results(last_query, offset=new_offset)
-            
-            if results:
-                # IMPORTANT: from_callback=True ensures editing
-                await send_results(cq.message, results, total_count, offset=new_offset, header=f"🔎 ফলাফল: **{last_query}**", from_callback=True)
-            else:
-                await cq.answer("⚠️ আর কোনো ফলাফল নেই!", show_alert=True)
-
-        # --- FIX: WORKING FILTERS (Quality, Language, Season) ---
-        elif data == "filter_quality":
-            buttons = [
-                [InlineKeyboardButton("480p", callback_data="add_filter_480p"), InlineKeyboardButton("720p", callback_data="add_filter_720p")],
-                [InlineKeyboardButton("1080p", callback_data="add_filter_1080p"), InlineKeyboardButton("4K / 2160p", callback_data="add_filter_4k")],
-                [InlineKeyboardButton("🔙 Back to Results", callback_data="back_to_search")]
-            ]
-            await cq.message.edit_text("🎥 **Select Quality:**", reply_markup=InlineKeyboardMarkup(buttons))
+async def cb_top_searching(cq, data, user_id):
+    top_movies = await get_top_movies()
+    
+    if not top_movies:
+        await cq.answer("⚠️ No popular movies found yet!", show_alert=True)
+        return
+    
+    msg_text = "⭐ **TOP 10 MOST SEARCHED MOVIES:**\n\n"
+    buttons = []
+    is_verify_on = await get_setting("verification_mode")
+    if is_verify_on:
+        links = await asyncio.gather(*(
+            create_verification_link(movie['message_id'], user_id, movie.get('chat_id', CHANNEL_ID))
+            for movie in top_movies
+        ))
+    else:
+        links = [f"{WATCH_LINK}{movie['message_id']}" for movie in top_movies]
 
-        elif data == "filter_lang":
-            buttons = [
-                [InlineKeyboardButton("Hindi", callback_data="add_filter_Hindi"), InlineKeyboardButton("Bengali", callback_data="add_filter_Bengali")],
-                [InlineKeyboardButton("English", callback_data="add_filter_English"), InlineKeyboardButton("Tamil", callback_data="add_filter_Tamil")],
-                [InlineKeyboardButton("🔙 Back to Results", callback_data="back_to_search")]
-            ]
-            await cq.message.edit_text("🗣 **Select Language:**", reply_markup=InlineKeyboardMarkup(buttons))
+    for idx, (movie, link) in enumerate(zip(top_movies, links), 1):
+        title = movie.get('title', 'Unknown')
+        views = movie.get('views_count', 0)
+        
+        msg_text += f"{idx}. {title} ({views} views)\n"
+        buttons.append([InlineKeyboardButton(f"{idx}. {title}", url=link)])
+    
+    buttons.append([InlineKeyboardButton("🔙 Back", callback_data="home_menu")])
+    
+    await cq.message.edit_caption(caption=msg_text, reply_markup=InlineKeyboardMarkup(buttons))
 
-        elif data == "filter_season":
-            buttons = [
-                [InlineKeyboardButton("Season 1", callback_data="add_filter_S01"), InlineKeyboardButton("Season 2", callback_data="add_filter_S02")],
-                [InlineKeyboardButton("Season 3", callback_data="add_filter_S03"), InlineKeyboardButton("Season 4", callback_data="add_filter_S04")],
-                [InlineKeyboardButton("🔙 Back to Results", callback_data="back_to_search")]
-            ]
-            await cq.message.edit_text("📺 **Select Season:**", reply_markup=InlineKeyboardMarkup(buttons))
+# --- FIX: PAGINATION HANDLER (IN-PLACE EDIT) ---
+async def cb_page(cq, data, user_id):
+    last_query = await get_last_query(user_id)
+    if not last_query:
+        await cq.answer("⚠️ সেশন এক্সপায়ার হয়েছে। আবার সার্চ করুন।", show_alert=True)
+        return
+    
+    current_offset = int(data.split("_")[2])
+    
+    if "next" in data:
+        new_offset = current_offset + RESULTS_COUNT
+    else:
+        new_offset = max(0, current_offset - RESULTS_COUNT)
+    
+    results, total_count, _, _, _ = await get_search_results(last_query, offset=new_offset)
+    
+    if results:
+        # IMPORTANT: from_callback=True ensures editing
+        await send_results(cq.message, results, total_count, offset=new_offset, header=f"🔎 ফলাফল: **{last_query}**", from_callback=True)
+    else:
+        await cq.answer("⚠️ আর কোনো ফলাফল নেই!", show_alert=True)
 
-        elif data.startswith("add_filter_"):
-            # Logic: Get last query, Append new filter, Save, Search again
-            filter_text = data.split("_")[2]
-            user_data = await users_col.find_one({"_id": user_id})
-            
-            if user_data and "last_query" in user_data:
-                old_query = user_data["last_query"]
-                # Append filter text to query (e.g. "Avengers" -> "Avengers 720p")
-                new_query = f"{old_query} {filter_text}".strip()
-                
-                await users_col.update_one({"_id": user_id}, {"$set": {"last_query": new_query}})
-                
-                # Run search with new query
-                results, total_count, _, _, _ = await get_search_results(new_query, offset=0)
-                
-                if results:
-                    await send_results(cq.message, results, total_count, offset=0, header=f"🔎 ফিল্টার করা হয়েছে: **{new_query}**", from_callback=True)
-                else:
-                    await cq.answer("⚠️ এই ফিল্টারে কোনো ফাইল পাওয়া যায়নি!", show_alert=True)
-                    # Go back to original results
-                    await users_col.update_one({"_id": user_id}, {"$set": {"last_query": old_query}})
-            else:
-                await cq.answer("⚠️ সেশন টাইমআউট! আবার সার্চ করুন।", show_alert=True)
+# --- FIX: WORKING FILTERS (Quality, Language, Season) ---
+async def cb_filter_quality(cq, data, user_id):
+    await cq.message.edit_text("🎥 **Select Quality:**", reply_markup=QUALITY_MARKUP)
 
-        elif data == "back_to_search":
-            user_data = await users_col.find_one({"_id": user_id})
-            if user_data and "last_query" in user_data:
-                results, total_count, _, _, _ = await get_search_results(user_data["last_query"], offset=0)
-                await send_results(cq.message, results, total_count, offset=0, header=f"🔎 ফলাফল: **{user_data['last_query']}**", from_callback=True)
-            else:
-                await cq.answer("Expired!", show_alert=True)
+async def cb_filter_lang(cq, data, user_id):
+    await cq.message.edit_text("🗣 **Select Language:**", reply_markup=LANG_MARKUP)
 
-        elif data == "ignore":
-            await cq.answer()
+async def cb_filter_season(cq, data, user_id):
+    await cq.message.edit_text("📺 **Select Season:**", reply_markup=SEASON_MARKUP)
 
-        elif data.startswith("report_"):
-            await cq.answer("Report Sent!", show_alert=True)
+async def cb_add_filter(cq, data, user_id):
+    # Logic: Get last query, Append new filter, Save, Search again
+    filter_text = data.split("_")[2]
+    old_query = await get_last_query(user_id)
+    
+    if old_query:
+        # Append filter text to query (e.g. "Avengers" -> "Avengers 720p")
+        new_query = f"{old_query} {filter_text}".strip()
         
-        elif data.startswith("confirm_del_"):
-            try:
-                title_encoded = data.replace("confirm_del_", "")
-                title = urllib.parse.unquote_plus(title_encoded)
-                result = await movies_col.delete_many({"title": {"$regex": re.escape(title), "$options": "i"}})
-                await cq.message.edit_text(f"✅ **সফল!**\n**'{title}'** সম্পর্কিত মোট **{result.deleted_count}** টি ফাইল ডিলিট করা হয়েছে।")
-            except Exception as e:
-                await cq.message.edit_text(f"❌ এরর: {e}")
+        # In-memory only; Mongo keeps the user's typed query
+        LAST_QUERY[user_id] = new_query
+        
+        # Run search with new query (no TMDB / fuzzy guesses: a failed filter just rolls back)
+        results, total_count, _, _, _ = await get_search_results(new_query, offset=0, corrections=False)
+        
+        if results:
+            await send_results(cq.message, results, total_count, offset=0, header=f"🔎 ফিল্টার করা হয়েছে: **{new_query}**", from_callback=True)
+        else:
+            await cq.answer("⚠️ এই ফিল্টারে কোনো ফাইল পাওয়া যায়নি!", show_alert=True)
+            # Go back to original results
+            LAST_QUERY[user_id] = old_query
+    else:
+        await cq.answer("⚠️ সেশন টাইমআউট! আবার সার্চ করুন।", show_alert=True)
 
-        elif data == "cancel_del":
-            await cq.message.edit_text("❌ ডিলিট বাতিল করা হয়েছে।")
-            
-        elif data == "confirm_delete_all_movies":
-            await movies_col.delete_many({})
-            await cq.message.edit_text("✅ All Deleted!")
+async def cb_back_to_search(cq, data, user_id):
+    last_query = await get_last_query(user_id)
+    if last_query:
+        results, total_count, _, _, _ = await get_search_results(last_query, offset=0)
+        await send_results(cq.message, results, total_count, offset=0, header=f"🔎 ফলাফল: **{last_query}**", from_callback=True)
+    else:
+        await cq.answer("Expired!", show_alert=True)
 
-        elif data == "cancel_delete_all_movies":
-            await cq.message.edit_text("❌ Cancelled!")
+async def cb_report(cq, data, user_id):
+    await cq.answer("Report Sent!", show_alert=True)
 
-        elif data.startswith("request_movie_"):
-            try:
-                _, user_id_str, movie_name_encoded = data.split("_", 2)
-                user_id = int(user_id_str)
-                movie_name = urllib.parse.unquote_plus(movie_name_encoded)
-                
-                await cq.answer("✅ আপনার রিকোয়েস্ট এডমিনের কাছে পাঠানো হয়েছে!", show_alert=True)
-                await cq.message.edit_text(f"✅ **রিকোয়েস্ট সফল!**\n\n🎬 মুভি: `{movie_name}`\n\nঅনুগ্রহ করে অপেক্ষা করুন, এডমিন শীঘ্রই এটি আপলোড করবেন।")
-
-                buttons = InlineKeyboardMarkup([
-                    [
-                        InlineKeyboardButton("📤 Uploading", callback_data=f"rep_uploading_{user_id}_{movie_name_encoded}"),
-                        InlineKeyboardButton("✅ Uploaded", callback_data=f"rep_uploaded_{user_id}_{movie_name_encoded}")
-                    ],
-                    [
-                        InlineKeyboardButton("❌ Unavailable", callback_data=f"rep_unavailable_{user_id}_{movie_name_encoded}"),
-                        InlineKeyboardButton("🕵️ Already Available", callback_data=f"rep_already_{user_id}_{movie_name_encoded}")
-                    ],
-                    [
-                        InlineKeyboardButton("⚠️ Spelling Error", callback_data=f"rep_spelling_{user_id}_{movie_name_encoded}"),
-                        InlineKeyboardButton("🗑 Delete Msg", callback_data=f"rep_delete_{user_id}_{movie_name_encoded}")
-                    ]
-                ])
+async def cb_confirm_del(cq, data, user_id):
+    try:
+        title = PENDING.pop(data.replace("confirm_del_", ""), None)
+        if title is None:
+            await cq.answer("Expired!", show_alert=True)
+            return
+        result = await movies_col.delete_many(delete_filter(title))
+        clear_search_cache()
+        reset_fuzzy_choices()
+        _SOURCE_CHAT.clear()
+        await cq.message.edit_text(f"✅ **সফল!**\n**'{title}'** সম্পর্কিত মোট **{result.deleted_count}** টি ফাইল ডিলিট করা হয়েছে।")
+    except Exception as e:
+        await cq.message.edit_text(f"❌ এরর: {e}")
 
-                user = await app.get_users(user_id)
-                user_mention = user.mention if user else f"User ID: {user_id}"
+async def cb_cancel_del(cq, data, user_id):
+    await cq.message.edit_text("❌ ডিলিট বাতিল করা হয়েছে।")
 
-                admin_msg_text = (
-                    f"🔔 **নতুন মুভি রিকোয়েস্ট!** (Manual)\n\n"
-                    f"👤 রিকোয়েস্টকারী: {user_mention}\n"
-                    f"🎬 মুভির নাম: `{movie_name}`\n\n"
-                    f"👇 নিচের বাটন দিয়ে রিপ্লাই দিন:"
-                )
+async def cb_confirm_delete_all(cq, data, user_id):
+    await movies_col.delete_many({})
+    clear_search_cache()
+    reset_fuzzy_choices()
+    _SOURCE_CHAT.clear()
+    await cq.message.edit_text("✅ All Deleted!")
 
-                for admin_id in ADMIN_IDS:
-                    try:
-                        await app.send_message(chat_id=admin_id, text=admin_msg_text, reply_markup=buttons)
-                    except Exception as e:
-                        logger.error(f"Failed to send request to admin {admin_id}: {e}")
+async def cb_cancel_delete_all(cq, data, user_id):
+    await cq.message.edit_text("❌ Cancelled!")
 
-            except Exception as e:
-                logger.error(f"Request Error: {e}")
+async def cb_request_movie(cq, data, user_id):
+    try:
+        payload = PENDING.pop(data.replace("request_movie_", ""), None)
+        if payload is None:
+            await cq.answer("Expired!", show_alert=True)
+            return
+        user_id, movie_name = payload
+        movie_name_encoded = urllib.parse.quote_plus(movie_name)
+        
+        # Alert + message edit are independent, so both round trips overlap
+        user_feedback = asyncio.gather(
+            cq.answer("✅ আপনার রিকোয়েস্ট এডমিনের কাছে পাঠানো হয়েছে!", show_alert=True),
+            cq.message.edit_text(f"✅ **রিকোয়েস্ট সফল!**\n\n🎬 মুভি: `{movie_name}`\n\nঅনুগ্রহ করে অপেক্ষা করুন, এডমিন শীঘ্রই এটি আপলোড করবেন।")
+        )
+        # The requester usually clicks their own button: no get_users call needed
+        if cq.from_user.id == user_id:
+            await user_feedback
+            user = cq.from_user
+        else:
+            _, user = await asyncio.gather(user_feedback, app.get_users(user_id))
+
+        buttons = InlineKeyboardMarkup([
+            [
+                InlineKeyboardButton("📤 Uploading", callback_data=f"rep_uploading_{user_id}_{movie_name_encoded}"),
+                InlineKeyboardButton("✅ Uploaded", callback_data=f"rep_uploaded_{user_id}_{movie_name_encoded}")
+            ],
+            [
+                InlineKeyboardButton("❌ Unavailable", callback_data=f"rep_unavailable_{user_id}_{movie_name_encoded}"),
+                InlineKeyboardButton("🕵️ Already Available", callback_data=f"rep_already_{user_id}_{movie_name_encoded}")
+            ],
+            [
+                InlineKeyboardButton("⚠️ Spelling Error", callback_data=f"rep_spelling_{user_id}_{movie_name_encoded}"),
+                InlineKeyboardButton("🗑 Delete Msg", callback_data=f"rep_delete_{user_id}_{movie_name_encoded}")
+            ]
+        ])
 
-        elif data.startswith("rep_"):
-            try:
-                _, action, user_id_str, movie_name_encoded = data.split("_", 3)
-                user_id = int(user_id_str)
-                movie_name = urllib.parse.unquote_plus(movie_name_encoded)
-                
-                user_msg = ""
-                admin_feedback = ""
-
-                if action == "uploading":
-                    user_msg = f"👋 হ্যালো!\n\nআপনার রিকোয়েস্ট করা মুভি **'{movie_name}'** আপলোড করা হচ্ছে।\nকিছুক্ষণ পর আবার সার্চ করুন। 📤"
-                    admin_feedback = "✅ আপনি 'Uploading' মার্ক করেছেন।"
-                
-                elif action == "uploaded":
-                    user_msg = f"👋 হ্যালো!\n\nআপনার রিকোয়েস্ট করা মুভি **'{movie_name}'** আপলোড করা হয়েছে! ✅\nএখনই বট থেকে সার্চ করে নামিয়ে নিন।"
-                    admin_feedback = "✅ আপনি 'Uploaded' মার্ক করেছেন।"
-
-                elif action == "unavailable":
-                    user_msg = f"😔 দুঃখিত!\n\nআপনার রিকোয়েস্ট করা **'{movie_name}'** মুভিটি বর্তমানে পাওয়া যাচ্ছে না। ❌"
-                    admin_feedback = "✅ আপনি 'Unavailable' মার্ক করেছেন।"
-
-                elif action == "already":
-                    user_msg = f"🔍 হ্যালো!\n\nমুভিটি **'{movie_name}'** ইতিমধ্যে আমাদের চ্যানেলে আছে।\nদয়া করে ভালো করে বানান চেক করে আবার সার্চ করুন। 🕵️"
-                    admin_feedback = "✅ আপনি 'Already Available' মার্ক করেছেন।"
-
-                elif action == "spelling":
-                    user_msg = f"⚠️ হ্যালো!\n\nআপনার রিকোয়েস্ট করা মুভির বানান ভুল মনে হচ্ছে।\nদয়া করে সঠিক বানান (**English**) লিখে আবার সার্চ করুন।"
-                    admin_feedback = "✅ আপনি 'Spelling Error' মার্ক করেছেন।"
-
-                elif action == "delete":
-                    await cq.message.delete()
-                    return
+        user_mention = user.mention if user else f"User ID: {user_id}"
 
-                try:
-                    await app.send_message(chat_id=user_id, text=user_msg)
-                except Exception:
-                    admin_feedback += "\n(কিন্তু ইউজারকে মেসেজ পাঠানো যায়নি)"
+        admin_msg_text = (
+            f"🔔 **নতুন মুভি রিকোয়েস্ট!** (Manual)\n\n"
+            f"👤 রিকোয়েস্টকারী: {user_mention}\n"
+            f"🎬 মুভির নাম: `{movie_name}`\n\n"
+            f"👇 নিচের বাটন দিয়ে রিপ্লাই দিন:"
+        )
 
-                await cq.message.edit_text(f"🔒 **রিকোয়েস্ট ক্লোজড!**\n🎬 মুভি: `{movie_name}`\n👮 একশন নিয়েছেন: {cq.from_user.mention}\n📝 স্ট্যাটাস: {admin_feedback}")
+        results = await notify_admins(admin_msg_text, buttons)
+        for admin_id, res in zip(ADMIN_IDS, results):
+            if isinstance(res, Exception):
+                logger.error("Failed to send request to admin %s: %s", admin_id, res)
 
-            except Exception as e:
-                logger.error(f"Admin Reply Error: {e}")
+    except Exception as e:
+        logger.error("Request Error: %s", e)
+
+# Admin reply actions: action -> (message to the user, status shown to admins)
+REP_REPLIES = {
+    "uploading": (
+        "👋 হ্যালো!\n\nআপনার রিকোয়েস্ট করা মুভি **'{name}'** আপলোড করা হচ্ছে।\nকিছুক্ষণ পর আবার সার্চ করুন। 📤",
+        "✅ আপনি 'Uploading' মার্ক করেছেন।"
+    ),
+    "uploaded": (
+        "👋 হ্যালো!\n\nআপনার রিকোয়েস্ট করা মুভি **'{name}'** আপলোড করা হয়েছে! ✅\nএখনই বট থেকে সার্চ করে নামিয়ে নিন।",
+        "✅ আপনি 'Uploaded' মার্ক করেছেন।"
+    ),
+    "unavailable": (
+        "😔 দুঃখিত!\n\nআপনার রিকোয়েস্ট করা **'{name}'** মুভিটি বর্তমানে পাওয়া যাচ্ছে না। ❌",
+        "✅ আপনি 'Unavailable' মার্ক করেছেন।"
+    ),
+    "already": (
+        "🔍 হ্যালো!\n\nমুভিটি **'{name}'** ইতিমধ্যে আমাদের চ্যানেলে আছে।\nদয়া করে ভালো করে বানান চেক করে আবার সার্চ করুন। 🕵️",
+        "✅ আপনি 'Already Available' মার্ক করেছেন।"
+    ),
+    "spelling": (
+        "⚠️ হ্যালো!\n\nআপনার রিকোয়েস্ট করা মুভির বানান ভুল মনে হচ্ছে।\nদয়া করে সঠিক বানান (**English**) লিখে আবার সার্চ করুন।",
+        "✅ আপনি 'Spelling Error' মার্ক করেছেন।"
+    ),
+}
+
+async def cb_rep(cq, data, user_id):
+    try:
+        _, action, user_id_str, movie_name_encoded = data.split("_", 3)
+
+        if action == "delete":
+            await cq.message.delete()
+            return
+
+        reply = REP_REPLIES.get(action)
+        if reply is None:
+            await cq.answer("Unknown action!", show_alert=True)
+            return
+
+        user_id = int(user_id_str)
+        movie_name = urllib.parse.unquote_plus(movie_name_encoded)
+        user_msg = reply[0].format(name=movie_name)
+        admin_feedback = reply[1]
+
+        try:
+            await app.send_message(chat_id=user_id, text=user_msg)
+        except Exception:
+            admin_feedback += "\n(কিন্তু ইউজারকে মেসেজ পাঠানো যায়নি)"
+
+        await cq.message.edit_text(f"🔒 **রিকোয়েস্ট ক্লোজড!**\n🎬 মুভি: `{movie_name}`\n👮 একশন নিয়েছেন: {cq.from_user.mention}\n📝 স্ট্যাটাস: {admin_feedback}")
 
+    except Exception as e:
+        logger.error("Admin Reply Error: %s", e)
+
+# Exact callback_data -> handler (one dict lookup per click)
+CALLBACK_EXACT = {
+    "home_menu": cb_home_menu,
+    "help_menu": cb_help_menu,
+    "about_menu": cb_about_menu,
+    "top_searching": cb_top_searching,
+    "filter_quality": cb_filter_quality,
+    "filter_lang": cb_filter_lang,
+    "filter_season": cb_filter_season,
+    "back_to_search": cb_back_to_search,
+    "cancel_del": cb_cancel_del,
+    "confirm_delete_all_movies": cb_confirm_delete_all,
+    "cancel_delete_all_movies": cb_cancel_delete_all,
+}
+# Prefixed callback_data: first word -> (full prefix, handler), one lookup instead of a startswith scan
+CALLBACK_PREFIX = {
+    "next": ("next_page_", cb_page),
+    "prev": ("prev_page_", cb_page),
+    "add": ("add_filter_", cb_add_filter),
+    "report": ("report_", cb_report),
+    "confirm": ("confirm_del_", cb_confirm_del),
+    "request": ("request_movie_", cb_request_movie),
+    "rep": ("rep_", cb_rep),
+}
+
+# One-shot actions (requests, admin replies, deletes): a double tap or client retry
+# within 2s is dropped. Navigation buttons are never deduplicated.
+_ONE_SHOT_EXACT = frozenset({"confirm_delete_all_movies"})
+_ONE_SHOT_PREFIXES = ("request_movie_", "rep_", "confirm_del_")
+_recent_clicks = TTLCache(maxsize=100_000, ttl=2)
+
+@app.on_callback_query()
+async def callback_handler(_, cq: CallbackQuery):
+    data = cq.data
+    user_id = cq.from_user.id
+    repeated = False
+    if data in _ONE_SHOT_EXACT or data.startswith(_ONE_SHOT_PREFIXES):
+        click_key = (user_id, cq.message.id if cq.message else cq.inline_message_id, data)
+        repeated = click_key in _recent_clicks
+        _recent_clicks[click_key] = True
+    if data == "ignore" or repeated:
+        # Label buttons and repeated one-shot taps: nothing to do but stop the spinner
+        try:
+            await cq.answer()
+        except Exception:
+            pass
+        return
+    
+    try:
+        handler = CALLBACK_EXACT.get(data)
+        if handler is None:
+            entry = CALLBACK_PREFIX.get(data.partition("_")[0])
+            if entry and data.startswith(entry[0]):
+                handler = entry[1]
+        if handler:
+            await handler(cq, data, user_id)
     except MessageNotModified:
         await cq.answer("Already on this page!")
     except Exception as e:
-        logger.error(f"Callback Error: {e}")
+        logger.error("Callback Error: %s", e)
+
+async def main():
+    global BOT_USERNAME, BOT_FIRST_NAME, WATCH_LINK, VERIFIED_LINK, ADD_GROUP_LINK
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=THREAD_POOL_SIZE, thread_name_prefix="bot-worker")
+    )
+    try:
+        # First round trip here, not on the first user's click
+        await async_client.admin.command("ping")
+    except Exception as e:
+        logger.error("MongoDB Ping Error: %s", e)
+    await app.start()
+    BOT_USERNAME = app.me.username
+    BOT_FIRST_NAME = app.me.first_name
+    WATCH_LINK = f"https://t.me/{BOT_USERNAME}?start=watch_"
+    VERIFIED_LINK = f"https://t.me/{BOT_USERNAME}?start=verified_"
+    ADD_GROUP_LINK = f"https://t.me/{BOT_USERNAME}?startgroup=true"
+    await idle()
+    await flush_views() # Don't lose buffered view counts on shutdown
+    await app.stop()
 
 if __name__ == "__main__":
     print("🚀 Bot Started (Ultimate Version with Pagination & Filters)...")
-    Thread(target=run_flask).start() # Start Flask Web Server
+    app.loop.create_task(ensure_indexes()) # Create Missing Indexes
+    app.loop.create_task(run_web_server()) # Start Web Server
+    app.loop.create_task(verify_flusher()) # Start Verification Token Writer
+    app.loop.create_task(delete_worker()) # Start Scheduled Delete Worker
+    app.loop.create_task(view_flusher()) # Start View Count Writer
     app.loop.create_task(init_settings()) # Init Settings
     app.loop.create_task(auto_group_messenger()) # Start Auto Msg
-    app.run() # Start Bot
+    app.run(main()) # Start Bot
+    if tmdb_session and not tmdb_session.closed:
+        app.loop.run_until_complete(tmdb_session.close())
+    log_listener.stop() # Flush queued log records